@@ -40,6 +40,11 @@ setuptools.setup(
     extras_require={
         'dev': DEV_REQUIRES,
     },
+    entry_points={
+        'console_scripts': [
+            'priolib=priolib.cli:main',
+        ],
+    },
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: GPLv3 License",
@@ -0,0 +1,143 @@
+import itertools
+import threading
+import time
+from typing import Any, Collection, Dict, List, Optional, Sequence
+
+
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+
+class Endpoint:
+    """
+    A server address together with its observed health and latency.
+    """
+
+    def __init__(self, addr: str) -> None:
+        self.addr = addr
+        self.outstanding = 0
+        self.requests = 0
+        self.errors = 0
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+    def available(self, now: float) -> bool:
+        return now >= self.ejected_until
+
+    def __str__(self) -> str:
+        return f'({self.addr}, {self.outstanding}, {self.requests}, {self.errors}, {self.latency})'
+
+
+class Balancer:
+    """
+    Spread requests over several endpoints and route around failing ones.
+
+    ``strategy`` is ``round_robin`` or ``least_outstanding``; the latter
+    picks the endpoint with the fewest requests in flight, preferring
+    lower latency on ties. An endpoint that fails ``eject_after`` times in
+    a row is left out for ``eject_time`` seconds, doubling with every
+    repeated ejection up to ``max_eject_time``. A single success restores
+    it. If every endpoint is ejected the one due back soonest is used.
+    """
+
+    STRATEGIES = ('round_robin', 'least_outstanding')
+
+    def __init__(
+        self,
+        addrs: Sequence[str],
+        strategy: str = 'round_robin',
+        eject_after: int = 3,
+        eject_time: float = 5,
+        max_eject_time: float = 60,
+    ) -> None:
+        if not addrs:
+            raise ValueError('At least one endpoint is required.')
+        if strategy not in self.STRATEGIES:
+            raise ValueError(f'Unknown balancing strategy {strategy!r}.')
+        self.endpoints = [Endpoint(addr) for addr in addrs]
+        self.strategy = strategy
+        self.eject_after = eject_after
+        self.eject_time = eject_time
+        self.max_eject_time = max_eject_time
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        del state['_lock']
+        del state['_counter']
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def acquire(
+        self,
+        exclude: Collection[Endpoint] = (),
+        pin: Optional[Endpoint] = None,
+    ) -> Endpoint:
+        """
+        Pick an endpoint for the next attempt and count it as in flight.
+
+        Endpoints in ``exclude``, typically those already tried for the
+        same request, are only used when there is no other choice. A
+        ``pin`` is always used as is.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if pin is not None:
+                pin.outstanding += 1
+                pin.requests += 1
+                return pin
+            candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+            available = [e for e in candidates if e.available(now)]
+            if not available:
+                endpoint = min(candidates, key=lambda e: e.ejected_until)
+            elif self.strategy == 'least_outstanding':
+                start = next(self._counter)
+                n = len(available)
+                endpoint = min(
+                    (available[(start + i) % n] for i in range(n)),
+                    key=lambda e: (e.outstanding, e.latency or 0.0),
+                )
+            else:
+                endpoint = available[next(self._counter) % len(available)]
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, latency: Optional[float], ok: bool) -> None:
+        """
+        Record the outcome of an attempt started with ``acquire``.
+        """
+        with self._lock:
+            endpoint.outstanding -= 1
+            if ok:
+                endpoint.failures = 0
+                endpoint.ejections = 0
+                endpoint.ejected_until = 0.0
+                if latency is not None:
+                    if endpoint.latency is None:
+                        endpoint.latency = latency
+                    else:
+                        endpoint.latency = 0.8 * endpoint.latency + 0.2 * latency
+                return
+            endpoint.errors += 1
+            endpoint.failures += 1
+            # A previously ejected endpoint is ejected again on its first failure.
+            if endpoint.failures >= self.eject_after or endpoint.ejections:
+                timeout = min(
+                    self.max_eject_time,
+                    self.eject_time * 2 ** endpoint.ejections,
+                )
+                endpoint.ejected_until = time.monotonic() + timeout
+                endpoint.ejections += 1
+                endpoint.failures = 0
+
+    def healthy(self) -> List[Endpoint]:
+        now = time.monotonic()
+        with self._lock:
+            return [e for e in self.endpoints if e.available(now)]
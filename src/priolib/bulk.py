@@ -0,0 +1,252 @@
+import concurrent.futures
+import gzip
+import io
+import json
+import os
+import sys
+import time
+from typing import (
+    IO, Any, Callable, Dict, Iterator, Optional, Set, Tuple, Union,
+)
+
+from .client import APIClient, Deadline
+from .model import Task
+
+
+PathOrFile = Union[str, IO[str]]
+
+
+class ImportStats:
+
+    def __init__(self) -> None:
+        self.imported = 0
+        self.skipped = 0
+        self.elapsed = 0.0
+
+    @property
+    def rate(self) -> float:
+        """
+        Imported tasks per second.
+        """
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self) -> str:
+        return f'{self.imported} tasks imported, {self.skipped} skipped in {self.elapsed:.1f}s ({self.rate:.1f}/s)'
+
+
+def _open(path: PathOrFile, mode: str, compress: Optional[bool]) -> Tuple[IO[str], bool]:
+    """
+    Open ``path`` for text I/O, transparently (de)compressing with gzip.
+
+    Returns the file and whether it is owned by the caller.
+    """
+    if not isinstance(path, str):
+        return path, False
+    if path == '-':
+        stream = sys.stdout if 'w' in mode else sys.stdin
+        if not compress:
+            return stream, False
+        # Closing the gzip wrapper leaves the standard stream open.
+        gz = gzip.GzipFile(fileobj=stream.buffer, mode=mode + 'b')
+        return io.TextIOWrapper(gz, encoding='utf-8'), True
+    if compress is None:
+        compress = path.endswith('.gz')
+    if compress:
+        return io.TextIOWrapper(gzip.open(path, mode + 'b'), encoding='utf-8'), True
+    return open(path, mode, encoding='utf-8'), True
+
+
+def task_to_json(task: Task) -> Dict[str, Any]:
+    """
+    Return the complete server representation of a task.
+    """
+    return {
+        'id': task.id,
+        'title': task.title,
+        'targetLink': task.target,
+        'status': task.status,
+        'priority': task.priority,
+        'createdDate': task.created.isoformat() if task.created else None,
+        'modifiedDate': task.modified.isoformat() if task.modified else None,
+    }
+
+
+def export_tasks(
+    api: APIClient,
+    path: PathOrFile,
+    compress: Optional[bool] = None,
+    deadline: Optional[Deadline] = None,
+) -> int:
+    """
+    Write all tasks to ``path`` as newline-delimited JSON.
+
+    The server API has no pagination, so all tasks are fetched with a
+    single ``list_tasks`` call first: memory use grows with the number of
+    tasks, just as for ``list_tasks`` itself. Tasks are then encoded and
+    written one at a time. Files ending in ``.gz`` are gzip-compressed
+    unless ``compress`` says otherwise. Returns the number of tasks
+    written.
+
+    Raises:
+        APIError
+    """
+    tasks = api.list_tasks(deadline=api.deadline('list_tasks', deadline))
+    f, owned = _open(path, 'w', compress)
+    try:
+        for task in tasks:
+            f.write(json.dumps(task_to_json(task), sort_keys=True))
+            f.write('\n')
+        return len(tasks)
+    finally:
+        if owned:
+            f.close()
+
+
+def read_tasks(path: PathOrFile, compress: Optional[bool] = None) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Lazily yield ``(line number, task)`` pairs from an NDJSON file.
+
+    Every line must hold a JSON object with at least a ``title`` and a
+    ``targetLink``.
+
+    Raises:
+        ValueError
+    """
+    f, owned = _open(path, 'r', compress)
+    try:
+        for number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as exc:
+                raise ValueError(f'line {number}: {exc}') from exc
+            if not isinstance(item, dict):
+                raise ValueError(f'line {number}: expected a JSON object')
+            for key in ('title', 'targetLink'):
+                if not isinstance(item.get(key), str):
+                    raise ValueError(f'line {number}: missing or invalid {key!r}')
+            yield number, item
+    finally:
+        if owned:
+            f.close()
+
+
+def _read_checkpoint(path: Optional[str]) -> int:
+    if path is None or not os.path.exists(path):
+        return 0
+    with open(path, encoding='utf-8') as f:
+        return int(json.load(f)['line'])
+
+
+def _write_checkpoint(path: Optional[str], line: int) -> None:
+    if path is None:
+        return
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump({'line': line}, f)
+    os.replace(tmp, path)
+
+
+def import_tasks(
+    api: APIClient,
+    path: PathOrFile,
+    concurrency: int = 8,
+    checkpoint: Optional[str] = None,
+    compress: Optional[bool] = None,
+    deadline: Optional[Deadline] = None,
+    progress: Optional[Callable[[ImportStats], None]] = None,
+) -> ImportStats:
+    """
+    Create a task on the server for every line of an NDJSON file.
+
+    Lines are read lazily and uploaded by ``concurrency`` workers. At most
+    twice as many uploads are queued, so reading pauses while the server
+    falls behind. With a ``checkpoint`` file the highest line number up to
+    which every task has been created is recorded; a later run with the
+    same checkpoint resumes after it. Tasks created beyond that line by an
+    interrupted run are created again on resume. Tasks are created without
+    a priority, so a task's ``priority`` is set with a follow-up
+    ``update_task``.
+
+    On the first failed upload no further lines are read, the checkpoint
+    is brought up to date and the error is raised.
+
+    Raises:
+        APIError
+        ConnectionError
+        ValueError
+    """
+    stats = ImportStats()
+    start = time.monotonic()
+    resume = _read_checkpoint(checkpoint)
+    watermark = resume
+    pending: Dict['concurrent.futures.Future[str]', int] = {}
+    inflight: Set[int] = set()
+    last = resume
+
+    def create(item: Dict[str, Any]) -> str:
+        task_id = api.create_task(
+            title=item['title'],
+            target=item['targetLink'],
+            status=item.get('status') or '',
+            deadline=api.deadline('create_task', deadline),
+        )
+        if item.get('priority'):
+            # Tasks are created without priority; set it separately.
+            api.update_task(
+                Task(id_=task_id, priority=item['priority']),
+                deadline=api.deadline('update_task', deadline),
+            )
+        return task_id
+
+    def collect(wait: str) -> None:
+        nonlocal watermark
+        done, _ = concurrent.futures.wait(pending, return_when=wait)
+        error = None
+        for future in done:
+            number = pending.pop(future)
+            if future.exception() is not None:
+                error = error or future.exception()
+                continue
+            inflight.discard(number)
+            stats.imported += 1
+        mark = min(inflight) - 1 if inflight else last
+        if error is None and mark > watermark:
+            watermark = mark
+            _write_checkpoint(checkpoint, watermark)
+        if error is not None:
+            raise error
+        if progress is not None:
+            stats.elapsed = time.monotonic() - start
+            progress(stats)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=concurrency) as pool:
+        try:
+            for number, item in read_tasks(path, compress):
+                if number <= resume:
+                    stats.skipped += 1
+                    continue
+                while len(pending) >= 2 * concurrency:
+                    collect(concurrent.futures.FIRST_COMPLETED)
+                pending[pool.submit(create, item)] = number
+                inflight.add(number)
+                last = number
+            while pending:
+                collect(concurrent.futures.FIRST_COMPLETED)
+        except BaseException:
+            for future in pending:
+                future.cancel()
+            # Record whatever completed before the failure.
+            concurrent.futures.wait(pending)
+            for future, number in pending.items():
+                if not future.cancelled() and future.exception() is None:
+                    inflight.discard(number)
+                    stats.imported += 1
+            mark = min(inflight) - 1 if inflight else last
+            if mark > watermark:
+                _write_checkpoint(checkpoint, mark)
+            raise
+    stats.elapsed = time.monotonic() - start
+    return stats
@@ -0,0 +1,93 @@
+import argparse
+import os
+import sys
+from typing import List, Optional
+
+from .bulk import ImportStats, export_tasks, import_tasks
+from .client import APIClient, APIError, ConnectionError, Deadline
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='priolib',
+        description='TaskPrio command line client.',
+    )
+    parser.add_argument(
+        '--addr',
+        default=os.environ.get('PRIOLIB_ADDR'),
+        help='TaskPrio server address (default: $PRIOLIB_ADDR)',
+    )
+    parser.add_argument(
+        '--timeout',
+        type=float,
+        help='overall time budget in seconds',
+    )
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    export = commands.add_parser('export', help='export tasks as NDJSON')
+    export.add_argument('file', help='output file, "-" for stdout')
+    export.add_argument(
+        '--gzip', action='store_true', default=None,
+        help='compress output (default: if file ends in .gz)',
+    )
+
+    import_ = commands.add_parser('import', help='import tasks from NDJSON')
+    import_.add_argument('file', help='input file, "-" for stdin')
+    import_.add_argument(
+        '--gzip', action='store_true', default=None,
+        help='decompress input (default: if file ends in .gz)',
+    )
+    import_.add_argument(
+        '--concurrency', type=int, default=8,
+        help='number of parallel uploads (default: 8)',
+    )
+    import_.add_argument(
+        '--checkpoint',
+        help='file recording progress; an interrupted import resumes from it',
+    )
+    return parser
+
+
+def _report(stats: ImportStats) -> None:
+    print(f'\r{stats}', end='', file=sys.stderr, flush=True)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if not args.addr:
+        parser.error('no server address given, use --addr or set PRIOLIB_ADDR')
+    api = APIClient(addr=args.addr)
+    deadline = Deadline(args.timeout) if args.timeout else None
+    try:
+        if args.command == 'export':
+            count = export_tasks(api, args.file, compress=args.gzip, deadline=deadline)
+            print(f'{count} tasks exported', file=sys.stderr)
+        else:
+            stats = import_tasks(
+                api,
+                args.file,
+                concurrency=args.concurrency,
+                checkpoint=args.checkpoint,
+                compress=args.gzip,
+                deadline=deadline,
+                progress=_report if sys.stderr.isatty() else None,
+            )
+            print(f'\r{stats}', file=sys.stderr)
+    except APIError as exc:
+        print(f'priolib: {exc.reason}: {exc.message}', file=sys.stderr)
+        return 1
+    except ConnectionError as exc:
+        print(f'priolib: connection failed: {exc.__cause__ or exc}', file=sys.stderr)
+        return 1
+    except ValueError as exc:
+        print(f'priolib: invalid input: {exc}', file=sys.stderr)
+        return 1
+    finally:
+        api.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
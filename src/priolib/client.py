@@ -1,55 +1,179 @@
 import json
-from typing import Dict, List, Optional, Tuple, Union, Any
+import os
+import threading
+import time
+import weakref
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence, Set, Tuple, Union, Any
 
-import requests
-import retrying
+from .balance import IDEMPOTENT_METHODS, Balancer, Endpoint
+from .model import Encoder, Event, Plan, Task
+from .profiling import stage
 
-from .model import Encoder, Plan, Task
+if TYPE_CHECKING:
+    # ``requests`` and ``retrying`` are imported on first use to keep
+    # ``import priolib.client`` cheap for short-lived processes.
+    import requests
+
+    from .hedge import Hedging
 
 
 DEFAULT_TIMEOUT = (3.05, 27)
 
+# Extra read time granted to a long poll beyond the time the server may
+# hold it.
+LONG_POLL_MARGIN = 10
+
 
 class ConnectionError(Exception):
     pass
 
 
+class DeadlineExceeded(ConnectionError):
+    pass
+
+
+class Deadline:
+    """
+    Point in time by which a call must complete, including all retries and
+    the backoff sleeps between them.
+
+    The same deadline may be passed to several calls to bound a sequence
+    of requests as a whole.
+    """
+
+    def __init__(self, timeout: float) -> None:
+        self.expires = time.monotonic() + timeout
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def bound(self, timeout: Tuple[float, float]) -> Tuple[float, float]:
+        """
+        Cap a ``(connect, read)`` timeout to the remaining budget.
+        """
+        remaining = self.remaining()
+        return (min(timeout[0], remaining), min(timeout[1], remaining))
+
+
 class APIError(Exception):
 
-    def __init__(self, reason: str, message: str, details: str) -> None:
+    def __init__(
+        self,
+        reason: str,
+        message: str,
+        details: str,
+        status: Optional[int] = None,
+    ) -> None:
         super().__init__()
         self.reason = reason
         self.message = message
         self.details = details
+        self.status = status
 
     @classmethod
-    def FromHTTPResponse(cls, response: requests.Response) -> 'APIError':
+    def FromHTTPResponse(cls, response: 'requests.Response') -> 'APIError':
         try:
             error = response.json()
             return cls(
                 reason=error['reason'],
                 message=error['message'],
                 details=error['details'],
+                status=response.status_code,
             )
         except (ValueError, KeyError):
             return cls(
                 reason=response.reason,
                 message='Unknown error state encountered.',
                 details='Failure conditions may be transitional.',
+                status=response.status_code,
             )
 
 
+def _encode(obj: Any) -> str:
+    with stage('encode'):
+        return json.dumps(obj, cls=Encoder, sort_keys=True)
+
+
+def _decode(response: 'requests.Response') -> Any:
+    with stage('decode'):
+        return response.json()
+
+
 class HTTPClient:
+    """
+    HTTP transport safe for concurrent use across threads and processes.
+
+    Every thread gets its own ``requests.Session`` so connection pools are
+    never shared between threads. Sessions are tagged with the PID that
+    created them; a forked child never reuses the parent's sockets and
+    transparently opens new connections on first use. Sessions are only
+    weakly tracked for ``close()``, so the session of a finished thread is
+    released together with its connections.
+    """
 
     def __init__(
         self,
         verify: bool,
         timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
         retries: int = 0,
+        backoff: float = 0,
     ) -> None:
         self.verify = verify
         self.timeout = timeout
         self.retries = retries
+        self.backoff = backoff
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions: 'weakref.WeakSet[requests.Session]' = weakref.WeakSet()
+        self._pid = os.getpid()
+
+    @property
+    def session(self) -> 'requests.Session':
+        """
+        Return the session of the calling thread in the current process.
+        """
+        pid = os.getpid()
+        session = getattr(self._local, 'session', None)
+        if session is None or self._local.pid != pid:
+            import requests
+            session = requests.Session()
+            with self._lock:
+                if self._pid != pid:
+                    # Forked child: sessions inherited from the parent share
+                    # sockets with it and must not be used or closed here.
+                    self._sessions = weakref.WeakSet()
+                    self._pid = pid
+                self._sessions.add(session)
+            self._local.session = session
+            self._local.pid = pid
+        return session
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        for key in ('_local', '_lock', '_sessions', '_pid'):
+            del state[key]
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._sessions = weakref.WeakSet()
+        self._pid = os.getpid()
+
+    def close(self) -> None:
+        """
+        Close all sessions opened by this process.
+        """
+        with self._lock:
+            sessions = list(self._sessions) if self._pid == os.getpid() else []
+            self._sessions = weakref.WeakSet()
+        for session in sessions:
+            session.close()
 
     def request(
         self,
@@ -58,71 +182,224 @@ class HTTPClient:
         params: Optional[Dict[str, str]] = None,
         headers: Optional[Dict[str, str]] = None,
         data: Optional[str] = None,
-    ) -> Union[requests.Response, Any]:
+        timeout: Optional[Tuple[float, float]] = None,
+        deadline: Optional[Deadline] = None,
+        balancer: Optional[Balancer] = None,
+    ) -> Union['requests.Response', Any]:
         """
         Retry HTTP request on ``ConnectionError`` and ``HTTPError``s.
+
+        Retries back off exponentially starting at ``backoff`` seconds.
+        With a deadline every attempt and sleep is capped to the remaining
+        budget and no attempt is started once it has run out. A request
+        whose retries are cut short by the deadline raises
+        ``DeadlineExceeded`` chained to the last error.
+
+        With a balancer ``url`` is relative to the endpoint chosen for each
+        attempt. Idempotent requests are retried on endpoints not tried
+        yet, all others stay on the endpoint they were first sent to.
+
+        Raises:
+            DeadlineExceeded
         """
+        import requests
+        import retrying
+
+        timeout = self.timeout if timeout is None else timeout
+        tried: Set[Endpoint] = set()
+        expired = False
+        last_error: Optional[Exception] = None
+
+        def stop(attempts: int, delay_ms: float) -> bool:
+            nonlocal expired
+            if deadline is not None and deadline.expired:
+                expired = True
+                return True
+            return attempts >= self.retries
+
+        def wait(attempts: int, delay_ms: float) -> float:
+            sleep = self.backoff * 2 ** (attempts - 1)
+            if deadline is not None:
+                sleep = min(sleep, deadline.remaining())
+            return sleep * 1000
+
+        def retry_on(exc: Exception) -> bool:
+            nonlocal last_error
+            if isinstance(exc, (requests.exceptions.ConnectionError, requests.exceptions.HTTPError)):
+                last_error = exc
+                return True
+            return False
+
         @retrying.retry(
-            stop_max_attempt_number=self.retries,
-            retry_on_exception=lambda e: isinstance(
-                e, requests.exceptions.ConnectionError) or isinstance(
-                    e, requests.exceptions.HTTPError),
+            stop_func=stop,
+            wait_func=wait,
+            retry_on_exception=retry_on,
         )
-        def do_request() -> requests.Response:
-            response = requests.request(
-                method=method,
-                url=url,
-                params=params,
-                headers=headers,
-                data=data,
-                verify=self.verify,
-                timeout=self.timeout,
-            )
+        def do_request() -> 'requests.Response':
+            attempt_timeout = timeout
+            if deadline is not None:
+                if deadline.expired:
+                    raise DeadlineExceeded from last_error
+                attempt_timeout = deadline.bound(timeout)
+            if balancer is None:
+                return send(url, attempt_timeout)
+            if method in IDEMPOTENT_METHODS or not tried:
+                endpoint = balancer.acquire(exclude=tried)
+            else:
+                endpoint = balancer.acquire(pin=next(iter(tried)))
+            tried.add(endpoint)
+            start = time.monotonic()
+            ok = False
+            try:
+                response = send(endpoint.addr + url, attempt_timeout)
+                ok = True
+                return response
+            except requests.exceptions.HTTPError as exc:
+                ok = exc.response.status_code < 500
+                raise
+            finally:
+                balancer.release(endpoint, time.monotonic() - start, ok)
+
+        def send(target: str, attempt_timeout: Tuple[float, float]) -> 'requests.Response':
+            try:
+                with stage('transport'):
+                    response = self.session.request(
+                        method=method,
+                        url=target,
+                        params=params,
+                        headers=headers,
+                        data=data,
+                        verify=self.verify,
+                        timeout=attempt_timeout,
+                        stream=True,
+                    )
+                # The body is streamed so that reading it is timed apart
+                # from the transport; consume it before the next stage.
+                with stage('body'):
+                    response.content
+            except requests.exceptions.Timeout as exc:
+                if deadline is not None and deadline.expired:
+                    raise DeadlineExceeded from exc
+                raise
             response.raise_for_status()
             return response
-        return do_request()
+
+        try:
+            return do_request()
+        except (requests.exceptions.ConnectionError, requests.exceptions.HTTPError) as exc:
+            if expired:
+                # Retries were cut short by the deadline, not exhausted.
+                raise DeadlineExceeded from exc
+            raise
 
 
 class APIClient:
 
-    def __init__(self, addr: str, retries: int = 3) -> None:
+    def __init__(
+        self,
+        addr: Union[str, Sequence[str]],
+        retries: int = 3,
+        backoff: float = 0,
+        deadlines: Optional[Dict[str, float]] = None,
+        hedging: Optional['Hedging'] = None,
+        balancing: str = 'round_robin',
+    ) -> None:
         """
         Set API client retry behavior.
 
+        ``addr`` may list several equivalent servers. Requests are then
+        spread over them with the ``balancing`` strategy and failing
+        servers are avoided; see ``Balancer``.
+
+        ``deadlines`` maps API method names such as ``get_task`` to a
+        default time budget in seconds covering all attempts of a call.
+        A ``Deadline`` passed to a call takes precedence over the default.
+
+        With ``hedging`` slow ``get_task``, ``list_tasks`` and ``get_plan``
+        requests are raced against a second identical request; see
+        ``Hedging``. Long polls such as ``get_events`` are never hedged.
+
+        A single client may be shared by many threads and survives
+        ``fork()``; see ``HTTPClient``.
+
+        Raises:
+            ValueError
+        """
+        addrs = [addr] if isinstance(addr, str) else list(addr)
+        if not addrs:
+            raise ValueError('At least one endpoint is required.')
+        self.addr = addrs[0]
+        self.balancer = Balancer(addrs, strategy=balancing) if len(addrs) > 1 else None
+        self.deadlines = deadlines or {}
+        self.hedging = hedging
+        self.http = HTTPClient(verify=False, retries=retries, backoff=backoff)
+
+    def deadline(
+        self,
+        name: str,
+        deadline: Optional[Deadline] = None,
+    ) -> Optional[Deadline]:
         """
-        self.addr = addr
-        self.http = HTTPClient(verify=False, retries=retries)
+        Return the deadline for a call of the API method ``name``.
+        """
+        if deadline is None and name in self.deadlines:
+            return Deadline(self.deadlines[name])
+        return deadline
 
     def request(
         self,
         method: str,
         uri: str,
-        params: Dict[str, str] = {},
-        headers: Dict[str, str] = {},
+        params: Optional[Dict[str, str]] = None,
+        headers: Optional[Dict[str, str]] = None,
         data: Optional[str] = None,
-    ) -> requests.Response:
+        timeout: Optional[Tuple[float, float]] = None,
+        deadline: Optional[Deadline] = None,
+        hedge: bool = False,
+    ) -> 'requests.Response':
         """
         Retry on any HTTP error.
 
+        A ``GET`` with ``hedge`` set is hedged if the client has hedging
+        enabled.
         """
-        try:
+        import requests
+
+        def send() -> 'requests.Response':
             return self.http.request(
                 method=method,
-                url=self.addr + uri,
+                url=uri if self.balancer is not None else self.addr + uri,
                 params=params,
                 headers=headers,
                 data=data,
+                timeout=timeout,
+                deadline=deadline,
+                balancer=self.balancer,
             )
-        except requests.exceptions.ConnectionError as exc:
+
+        try:
+            if self.hedging is not None and hedge and method == 'GET':
+                return self.hedging.run(send, discard=lambda r: r.close())
+            return send()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
             raise ConnectionError from exc
         except requests.exceptions.HTTPError as exc:
             raise APIError.FromHTTPResponse(exc.response)
 
+    def close(self) -> None:
+        """
+        Release pooled connections.
+        """
+        if self.hedging is not None:
+            self.hedging.shutdown()
+        self.http.close()
+
     def create_task(
         self,
         title: str,
         target: str,
         status: Optional[str] = '',
+        deadline: Optional[Deadline] = None,
     ) -> str:
         """
         Create a new task on the server.
@@ -135,13 +412,14 @@ class APIClient:
             method='POST',
             uri='/tasks',
             headers={'Content-Type': 'application/json'},
-            data=json.dumps(payload),
+            data=_encode(payload),
+            deadline=self.deadline('create_task', deadline),
         )
         task_location = response.headers['Location']
         task_id = task_location.split('/')[-1]
         return task_id
 
-    def get_task(self, task_id: str) -> Task:
+    def get_task(self, task_id: str, deadline: Optional[Deadline] = None) -> Task:
         """
         Retrieve task from server by task ID.
 
@@ -152,20 +430,27 @@ class APIClient:
             method='GET',
             uri=f'/tasks/{task_id}',
             headers={'Accept': 'application/json'},
+            deadline=self.deadline('get_task', deadline),
+            hedge=True,
         )
-        payload = response.json()
-        return Task.unmarshal_json(payload)
+        payload = _decode(response)
+        with stage('model'):
+            return Task.unmarshal_json(payload)
 
-    def delete_task(self, task_id: str) -> None:
+    def delete_task(self, task_id: str, deadline: Optional[Deadline] = None) -> None:
         """
         Delete task by ID.
 
         Raises:
             APIError
         """
-        self.request('DELETE', f'/tasks/{task_id}')
+        self.request(
+            'DELETE',
+            f'/tasks/{task_id}',
+            deadline=self.deadline('delete_task', deadline),
+        )
 
-    def update_task(self, task: Task) -> None:
+    def update_task(self, task: Task, deadline: Optional[Deadline] = None) -> None:
         """
         Update task identified by the task ID of the given task object.
 
@@ -176,10 +461,11 @@ class APIClient:
             method='PATCH',
             uri=f'/tasks/{task.id}',
             headers={'Content-Type': 'application/json'},
-            data=json.dumps(task, cls=Encoder, sort_keys=True),
+            data=_encode(task),
+            deadline=self.deadline('update_task', deadline),
         )
 
-    def list_tasks(self) -> List[Task]:
+    def list_tasks(self, deadline: Optional[Deadline] = None) -> List[Task]:
         """
         List tasks ordered descending by creation date.
 
@@ -191,13 +477,17 @@ class APIClient:
             uri='/tasks',
             params={},
             headers={'Accept': 'application/json'},
+            deadline=self.deadline('list_tasks', deadline),
+            hedge=True,
         )
-        tasks = []
-        for item in response.json()['contents']:
-            tasks.append(Task.unmarshal_json(item))
+        payload = _decode(response)
+        with stage('model'):
+            tasks = []
+            for item in payload['contents']:
+                tasks.append(Task.unmarshal_json(item))
         return tasks
 
-    def get_plan(self) -> Plan:
+    def get_plan(self, deadline: Optional[Deadline] = None) -> Plan:
         """
         Get plan with tasks ordered by priority and status.
 
@@ -209,10 +499,14 @@ class APIClient:
             uri='/plan',
             params={},
             headers={'Accept': 'application/json'},
+            deadline=self.deadline('get_plan', deadline),
+            hedge=True,
         )
-        return Plan.unmarshal_json(response.json())
+        payload = _decode(response)
+        with stage('model'):
+            return Plan.unmarshal_json(payload)
 
-    def update_plan(self, plan: Plan) -> None:
+    def update_plan(self, plan: Plan, deadline: Optional[Deadline] = None) -> None:
         """
         Update plan with changed task status and priorities.
 
@@ -224,5 +518,43 @@ class APIClient:
             uri='/plan',
             params={},
             headers={'Content-Type': 'application/json'},
-            data=json.dumps(plan, cls=Encoder, sort_keys=True),
+            data=_encode(plan),
+            deadline=self.deadline('update_plan', deadline),
+        )
+
+    def get_events(
+        self,
+        offset: Optional[int] = None,
+        wait: float = 0,
+        deadline: Optional[Deadline] = None,
+    ) -> Tuple[int, List[Event]]:
+        """
+        Long-poll the change feed for events after the given offset.
+
+        Without an offset only the current head offset of the feed is
+        returned. The server holds the request for up to ``wait`` seconds
+        while no events are available, so the read timeout is extended to
+        cover the wait. Returns the offset to resume from and the events in
+        feed order.
+
+        Raises:
+            APIError
+        """
+        params = {'wait': str(wait)}
+        if offset is not None:
+            params['offset'] = str(offset)
+        connect, read = self.http.timeout
+        response = self.request(
+            method='GET',
+            uri='/events',
+            params=params,
+            headers={'Accept': 'application/json'},
+            timeout=(connect, max(read, wait + LONG_POLL_MARGIN)),
+            deadline=self.deadline('get_events', deadline),
         )
+        payload = _decode(response)
+        with stage('model'):
+            events = []
+            for item in payload.get('contents', []):
+                events.append(Event.unmarshal_json(item))
+        return payload['offset'], events
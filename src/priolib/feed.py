@@ -0,0 +1,194 @@
+import logging
+import threading
+import time
+from http import HTTPStatus
+from typing import Callable, Dict, List, Optional
+
+from .client import APIClient, APIError, ConnectionError
+from .model import Event, Lane, Plan, Task
+
+
+log = logging.getLogger(__name__)
+
+Subscriber = Callable[[Event], None]
+
+
+class ChangeFeed:
+    """
+    Keep a local ``Plan`` and task cache current from the server change feed.
+
+    Events are long-polled from ``APIClient.get_events`` and applied
+    incrementally. The feed offset is remembered so that a reconnect
+    resumes right after the last applied event. While the feed is
+    unavailable the plan is refreshed with a full ``get_plan`` at most
+    every ``fallback_interval`` seconds.
+
+    Applying an event is idempotent, so events that overlap with a full
+    refresh are harmless.
+    """
+
+    def __init__(
+        self,
+        api: APIClient,
+        wait: float = 20,
+        fallback_interval: float = 30,
+    ) -> None:
+        self.api = api
+        self.wait = wait
+        self.fallback_interval = fallback_interval
+        self.plan = Plan([], [], [], [], [])
+        self.tasks: Dict[str, Task] = {}
+        self.offset: Optional[int] = None
+        self.available = False
+        self._synced = float('-inf')
+        self._lock = threading.RLock()
+        self._subscribers: List[Subscriber] = []
+
+    def subscribe(self, callback: Subscriber) -> Callable[[], None]:
+        """
+        Call ``callback`` with every event after it has been applied.
+
+        Full refreshes are delivered as ``PlanUpdated`` events. Returns a
+        function that removes the subscription again.
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def sync(self) -> None:
+        """
+        Replace the local state with a full plan from the server.
+
+        Raises:
+            APIError
+            ConnectionError
+        """
+        self._snapshot(self.offset)
+
+    def poll(self) -> List[Event]:
+        """
+        Fetch and apply the next batch of events.
+
+        The first call records the feed head before taking a full snapshot
+        so that no event between the two is lost. The head is only kept
+        once the snapshot has been applied; until then every call starts
+        over. When the feed cannot be reached the plan falls back to a
+        periodic full refresh and an empty list is returned.
+
+        Raises:
+            APIError
+            ConnectionError
+        """
+        try:
+            if self.offset is None:
+                head, _ = self.api.get_events()
+                self._snapshot(head)
+                self.offset = head
+            offset, events = self.api.get_events(self.offset, wait=self.wait)
+        except APIError as exc:
+            if exc.status == HTTPStatus.GONE:
+                # The server no longer retains our offset: start over.
+                self.offset = None
+            self._fallback()
+            return []
+        except ConnectionError:
+            self._fallback()
+            return []
+        self.available = True
+        for event in events:
+            self.apply(event)
+        self.offset = offset
+        return events
+
+    def run(self, stop: threading.Event) -> None:
+        """
+        Poll the feed until ``stop`` is set.
+        """
+        while not stop.is_set():
+            try:
+                self.poll()
+            except (APIError, ConnectionError) as exc:
+                log.warning('Plan refresh failed: %r', exc)
+            if not self.available:
+                stop.wait(self.fallback_interval)
+
+    def apply(self, event: Event) -> None:
+        """
+        Apply a single event to the local state and notify subscribers.
+        """
+        with self._lock:
+            if event.kind == 'PlanUpdated' and event.plan is not None:
+                self._replace(event.plan)
+            elif event.kind in ('TaskCreated', 'TaskUpdated') and event.task is not None:
+                self._put(event.task, event.index)
+            elif event.kind == 'TaskDeleted' and event.task_id is not None:
+                self._discard(event.task_id)
+            else:
+                log.debug('Ignoring event %s', event)
+                return
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception:
+                log.exception('Change feed subscriber failed on %s', event)
+
+    def _snapshot(self, offset: Optional[int]) -> None:
+        plan = self.api.get_plan()
+        self._synced = time.monotonic()
+        self.apply(Event(
+            offset=offset if offset is not None else -1,
+            kind='PlanUpdated',
+            plan=plan,
+        ))
+
+    def _fallback(self) -> None:
+        self.available = False
+        if time.monotonic() - self._synced >= self.fallback_interval:
+            self.sync()
+
+    def _replace(self, plan: Plan) -> None:
+        self.plan = plan
+        self.tasks = {}
+        for status in ('Done', 'Today', 'Todo', 'Blocked', 'Later'):
+            for task in plan.lane(status):
+                self.tasks[task.id] = task
+
+    def _put(self, task: Task, index: Optional[int]) -> None:
+        old = self.tasks.get(task.id)
+        position = None
+        if old is not None:
+            position = self._remove_from_lane(old)
+            if old.status != task.status:
+                position = None
+        self.tasks[task.id] = task
+        lane = self._lane(task)
+        if lane is None:
+            return
+        if index is not None:
+            position = index
+        if position is None:
+            position = len(lane)
+        lane.insert(position, task)
+
+    def _discard(self, task_id: str) -> None:
+        old = self.tasks.pop(task_id, None)
+        if old is not None:
+            self._remove_from_lane(old)
+
+    def _lane(self, task: Task) -> Optional[Lane]:
+        try:
+            return self.plan.lane(task.status or '')
+        except ValueError:
+            return None
+
+    def _remove_from_lane(self, task: Task) -> Optional[int]:
+        lane = self._lane(task)
+        if lane is None or task.id not in lane:
+            return None
+        return lane.remove(task.id)
@@ -0,0 +1,276 @@
+import collections
+import concurrent.futures
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Deque, Dict, Optional, TypeVar
+
+
+T = TypeVar('T')
+
+
+class HedgeStats:
+    """
+    Counters describing how hedging behaved so far.
+    """
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.capped = 0
+
+    @property
+    def hedge_rate(self) -> float:
+        return self.hedged / self.requests if self.requests else 0.0
+
+    @property
+    def win_rate(self) -> float:
+        """
+        Fraction of hedges whose response arrived before the original's.
+        """
+        return self.hedge_wins / self.hedged if self.hedged else 0.0
+
+    def __str__(self) -> str:
+        return f'({self.requests}, {self.hedged}, {self.hedge_wins}, {self.capped})'
+
+
+class Hedging:
+    """
+    Issue a second, identical request when the first one is slow.
+
+    If no response has arrived after ``delay`` seconds a hedge request is
+    started and whichever succeeds first wins. Without a fixed ``delay``
+    the ``percentile`` of recently observed latencies is used once
+    ``min_samples`` have been collected. At most ``max_rate`` of the last
+    ``window`` requests are hedged so the extra load stays bounded.
+
+    Only use hedging for idempotent requests. A losing request that has
+    already started cannot be aborted; its result is handed to ``discard``
+    when it arrives so that resources such as connections are released.
+    """
+
+    def __init__(
+        self,
+        delay: Optional[float] = None,
+        percentile: float = 0.95,
+        max_rate: float = 0.05,
+        window: int = 1000,
+        min_samples: int = 20,
+        max_workers: int = 16,
+    ) -> None:
+        self.delay = delay
+        self.percentile = percentile
+        self.max_rate = max_rate
+        self.min_samples = min_samples
+        self.max_workers = max_workers
+        self.stats = HedgeStats()
+        self._latencies: Deque[float] = collections.deque(maxlen=window)
+        self._recent: Deque[bool] = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self._primaries = _Workers('priolib-request')
+        self._pid = os.getpid()
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = self.__dict__.copy()
+        state['_lock'] = None
+        state['_executor'] = None
+        state['_primaries'] = None
+        return state
+
+    def __setstate__(self, state: Dict[str, Any]) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+        self._primaries = _Workers('priolib-request')
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Return after how many seconds a request is hedged, if at all yet.
+        """
+        if self.delay is not None:
+            return self.delay
+        with self._lock:
+            if len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.percentile))
+        return ordered[index]
+
+    def run(
+        self,
+        fn: Callable[[], T],
+        discard: Optional[Callable[[T], None]] = None,
+    ) -> T:
+        """
+        Call ``fn``, hedging it with a second call if it is slow.
+
+        When no hedge can be sent, because no delay is known yet or the
+        rate cap is reached, ``fn`` simply runs on the calling thread.
+        Otherwise it runs on a long-lived worker thread so that the caller
+        can return as soon as either call succeeds. That pool grows with
+        demand and reuses its threads, so their HTTP sessions keep their
+        connections alive. Only hedges are queued on the ``max_workers``
+        pool.
+        """
+        start = time.monotonic()
+        delay = self.hedge_delay()
+        if delay is None or not self._allow():
+            return self._run_inline(fn, start, delay)
+        primary = self._primaries.submit(fn)
+        futures = [primary]
+        done, _ = concurrent.futures.wait(futures, timeout=delay)
+        if not done:
+            if self._allow():
+                futures.append(self._submit(fn))
+            else:
+                with self._lock:
+                    self.stats.capped += 1
+        hedged = len(futures) > 1
+        with self._lock:
+            self.stats.requests += 1
+            self._recent.append(hedged)
+            if hedged:
+                self.stats.hedged += 1
+
+        error: Optional[BaseException] = None
+        for future in concurrent.futures.as_completed(futures):
+            exc = future.exception()
+            if exc is not None:
+                error = error or exc
+                continue
+            with self._lock:
+                self._latencies.append(time.monotonic() - start)
+                if future is not primary:
+                    self.stats.hedge_wins += 1
+            for loser in futures:
+                if loser is not future:
+                    self._abandon(loser, discard)
+            return future.result()
+        assert error is not None
+        raise error
+
+    def _run_inline(self, fn: Callable[[], T], start: float, delay: Optional[float]) -> T:
+        try:
+            result = fn()
+        finally:
+            elapsed = time.monotonic() - start
+            with self._lock:
+                self.stats.requests += 1
+                self._recent.append(False)
+                if delay is not None and elapsed > delay:
+                    self.stats.capped += 1
+        with self._lock:
+            self._latencies.append(elapsed)
+        return result
+
+    def shutdown(self) -> None:
+        self._primaries.shutdown()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None and self._pid == os.getpid():
+            executor.shutdown(wait=False)
+
+    def _allow(self) -> bool:
+        with self._lock:
+            hedged = sum(self._recent)
+            return hedged + 1 <= self.max_rate * (len(self._recent) + 1)
+
+    def _submit(self, fn: Callable[[], T]) -> 'concurrent.futures.Future[T]':
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                # Worker threads do not survive fork(): start a new pool.
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix='priolib-hedge',
+                )
+                self._pid = os.getpid()
+            return self._executor.submit(fn)
+
+    @staticmethod
+    def _abandon(
+        future: 'concurrent.futures.Future[T]',
+        discard: Optional[Callable[[T], None]],
+    ) -> None:
+        if future.cancel() or discard is None:
+            return
+
+        def release(f: 'concurrent.futures.Future[T]') -> None:
+            if not f.cancelled() and f.exception() is None:
+                discard(f.result())
+        future.add_done_callback(release)
+
+
+class _Workers:
+    """
+    Unbounded pool of reusable daemon threads.
+
+    A task goes to an idle thread if there is one and to a new thread
+    otherwise, so no task ever waits for a free worker. Threads that stay
+    idle for ``idle_timeout`` seconds exit. Reusing threads keeps their
+    per-thread HTTP sessions, and with them their open connections.
+    """
+
+    def __init__(self, name: str, idle_timeout: float = 60) -> None:
+        self.name = name
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._queue: 'queue.SimpleQueue[Optional[Callable[[], None]]]' = queue.SimpleQueue()
+        self._idle = 0
+        self._pid = os.getpid()
+
+    def submit(self, fn: Callable[[], T]) -> 'concurrent.futures.Future[T]':
+        future: 'concurrent.futures.Future[T]' = concurrent.futures.Future()
+
+        def task() -> None:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = fn()
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+
+        with self._lock:
+            if self._pid != os.getpid():
+                # Worker threads do not survive fork(): start afresh.
+                self._reset()
+            if self._idle:
+                self._idle -= 1
+                self._queue.put(task)
+                return future
+        threading.Thread(target=self._work, args=(task,), name=self.name, daemon=True).start()
+        return future
+
+    def shutdown(self) -> None:
+        """
+        Let idle threads exit; busy ones exit once idle for too long.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            for _ in range(self._idle):
+                self._queue.put(None)
+            self._idle = 0
+
+    def _work(self, task: Optional[Callable[[], None]]) -> None:
+        while task is not None:
+            task()
+            with self._lock:
+                self._idle += 1
+            try:
+                task = self._queue.get(timeout=self.idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    # Tasks are queued under the lock, so one that arrived
+                    # just now is still picked up here.
+                    try:
+                        task = self._queue.get_nowait()
+                    except queue.Empty:
+                        self._idle -= 1
+                        return
@@ -0,0 +1,332 @@
+import bisect
+import datetime
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set,
+    Tuple,
+)
+
+from .model import Task
+
+
+PriorityKey = Tuple[int, Any]
+
+NO_PRIORITY: PriorityKey = (2, '')
+
+
+def priority_key(priority: Optional[str]) -> PriorityKey:
+    """
+    Return a sort key for a task priority.
+
+    Numeric priorities sort numerically, any other priority sorts
+    lexicographically after them and tasks without priority come last.
+    """
+    if not priority:
+        return NO_PRIORITY
+    try:
+        return (0, float(priority))
+    except ValueError:
+        return (1, priority)
+
+
+class _Keys(NamedTuple):
+    seq: int
+    status: Optional[str]
+    created: Optional[datetime.datetime]
+    modified: Optional[datetime.datetime]
+    priority: PriorityKey
+
+
+class TaskIndex:
+    """
+    In-memory secondary indexes over a collection of tasks.
+
+    Status is indexed by hash, creation and modification dates as well as
+    priority are kept in sorted lists so that range queries and ordered
+    scans use binary search. Indexes are maintained incrementally by
+    ``add``, ``update`` and ``remove``; tasks mutated in place must be
+    passed to ``update`` to be re-indexed.
+    """
+
+    def __init__(self, tasks: Iterable[Task] = ()) -> None:
+        self._seq = 0
+        self._tasks: Dict[str, Task] = {}
+        self._keys: Dict[str, _Keys] = {}
+        self._by_status: Dict[Optional[str], Set[str]] = {}
+        self._by_created: List[Tuple[datetime.datetime, str]] = []
+        self._by_modified: List[Tuple[datetime.datetime, str]] = []
+        self._by_priority: List[Tuple[PriorityKey, str]] = []
+        for task in tasks:
+            self.add(task)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __contains__(self, task_id: object) -> bool:
+        return task_id in self._tasks
+
+    def __iter__(self) -> Iterator[Task]:
+        return iter(self._tasks.values())
+
+    def get(self, task_id: str) -> Optional[Task]:
+        return self._tasks.get(task_id)
+
+    def add(self, task: Task) -> None:
+        """
+        Insert a task, replacing any indexed task with the same ID.
+        """
+        if task.id in self._tasks:
+            self.update(task)
+            return
+        self._seq += 1
+        self._insert(task, self._seq)
+
+    def update(self, task: Task) -> None:
+        """
+        Re-index a task that has changed, keeping its insertion position.
+
+        Raises:
+            KeyError
+        """
+        keys = self._delete(task.id)
+        self._insert(task, keys.seq)
+
+    def remove(self, task_id: str) -> Task:
+        """
+        Remove a task from all indexes and return it.
+
+        Raises:
+            KeyError
+        """
+        task = self._tasks[task_id]
+        self._delete(task_id)
+        return task
+
+    def query(self) -> 'Query':
+        return Query(self)
+
+    def _insert(self, task: Task, seq: int) -> None:
+        keys = _Keys(
+            seq=seq,
+            status=task.status,
+            created=task.created,
+            modified=task.modified,
+            priority=priority_key(task.priority),
+        )
+        self._tasks[task.id] = task
+        self._keys[task.id] = keys
+        self._by_status.setdefault(keys.status, set()).add(task.id)
+        if keys.created is not None:
+            bisect.insort(self._by_created, (keys.created, task.id))
+        if keys.modified is not None:
+            bisect.insort(self._by_modified, (keys.modified, task.id))
+        bisect.insort(self._by_priority, (keys.priority, task.id))
+
+    def _delete(self, task_id: str) -> _Keys:
+        keys = self._keys.pop(task_id)
+        del self._tasks[task_id]
+        ids = self._by_status[keys.status]
+        ids.discard(task_id)
+        if not ids:
+            del self._by_status[keys.status]
+        if keys.created is not None:
+            _discard(self._by_created, (keys.created, task_id))
+        if keys.modified is not None:
+            _discard(self._by_modified, (keys.modified, task_id))
+        _discard(self._by_priority, (keys.priority, task_id))
+        return keys
+
+    def _sorted(self, field: str) -> List[Tuple[Any, str]]:
+        if field == 'created':
+            return self._by_created
+        if field == 'modified':
+            return self._by_modified
+        if field == 'priority':
+            return self._by_priority
+        raise ValueError(f'Cannot order tasks by {field!r}.')
+
+    def _range(
+        self,
+        field: str,
+        since: Optional[datetime.datetime],
+        until: Optional[datetime.datetime],
+    ) -> Set[str]:
+        entries = self._sorted(field)
+        lo = 0 if since is None else bisect.bisect_left(entries, (since,))
+        hi = len(entries) if until is None else bisect.bisect_left(entries, (until,))
+        return {task_id for _, task_id in entries[lo:hi]}
+
+
+def _aware(value: Optional[datetime.datetime]) -> Optional[datetime.datetime]:
+    if value is None or value.tzinfo is not None:
+        return value
+    return value.astimezone()
+
+
+def _discard(entries: List[Tuple[Any, str]], entry: Tuple[Any, str]) -> None:
+    i = bisect.bisect_left(entries, entry)
+    if i < len(entries) and entries[i] == entry:
+        del entries[i]
+
+
+class Query:
+    """
+    Composable, immutable query over a ``TaskIndex``.
+
+    Each refinement returns a new query; nothing is evaluated until the
+    query is iterated or one of ``all``, ``first`` or ``count`` is called.
+    Date ranges include ``since`` and exclude ``until``. Task dates are
+    timezone-aware; naive bounds such as ``datetime.now()`` are taken to
+    be local time.
+    """
+
+    def __init__(
+        self,
+        index: TaskIndex,
+        statuses: Optional[Tuple[str, ...]] = None,
+        ranges: Tuple[Tuple[str, Optional[datetime.datetime], Optional[datetime.datetime]], ...] = (),
+        predicates: Tuple[Callable[[Task], bool], ...] = (),
+        order: Optional[Tuple[str, bool]] = None,
+        limit: Optional[int] = None,
+    ) -> None:
+        self._index = index
+        self._statuses = statuses
+        self._ranges = ranges
+        self._predicates = predicates
+        self._order = order
+        self._limit = limit
+
+    def _replace(self, **kwargs: Any) -> 'Query':
+        state = {
+            'statuses': self._statuses,
+            'ranges': self._ranges,
+            'predicates': self._predicates,
+            'order': self._order,
+            'limit': self._limit,
+        }
+        state.update(kwargs)
+        return Query(self._index, **state)
+
+    def status(self, *statuses: str) -> 'Query':
+        """
+        Match tasks with any of the given statuses.
+        """
+        if self._statuses is not None:
+            statuses = tuple(s for s in statuses if s in self._statuses)
+        return self._replace(statuses=statuses)
+
+    def created(
+        self,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+    ) -> 'Query':
+        return self._replace(ranges=self._ranges + (('created', _aware(since), _aware(until)),))
+
+    def modified(
+        self,
+        since: Optional[datetime.datetime] = None,
+        until: Optional[datetime.datetime] = None,
+    ) -> 'Query':
+        return self._replace(ranges=self._ranges + (('modified', _aware(since), _aware(until)),))
+
+    def where(self, predicate: Callable[[Task], bool]) -> 'Query':
+        """
+        Match tasks for which an arbitrary predicate holds.
+
+        Predicates are not indexed and are evaluated after all indexed
+        filters have narrowed down the candidates.
+        """
+        return self._replace(predicates=self._predicates + (predicate,))
+
+    def order_by(self, field: str, descending: bool = False) -> 'Query':
+        """
+        Order results by ``priority``, ``created`` or ``modified``.
+
+        Tasks without a value for the field always come last.
+
+        Raises:
+            ValueError
+        """
+        self._index._sorted(field)
+        return self._replace(order=(field, descending))
+
+    def limit(self, n: int) -> 'Query':
+        return self._replace(limit=n)
+
+    def __iter__(self) -> Iterator[Task]:
+        return iter(self.all())
+
+    def all(self) -> List[Task]:
+        ordered = self._ordered(self._matching())
+        if self._limit is not None:
+            ordered = ordered[:self._limit]
+        return [self._index._tasks[task_id] for task_id in ordered]
+
+    def first(self) -> Optional[Task]:
+        tasks = self.limit(1).all()
+        return tasks[0] if tasks else None
+
+    def count(self) -> int:
+        n = len(self._matching())
+        return n if self._limit is None else min(n, self._limit)
+
+    def _matching(self) -> Set[str]:
+        ids = self._candidates()
+        if self._predicates:
+            tasks = self._index._tasks
+            ids = {
+                task_id for task_id in ids
+                if all(p(tasks[task_id]) for p in self._predicates)
+            }
+        return ids
+
+    def _candidates(self) -> Set[str]:
+        index = self._index
+        sets: List[Set[str]] = []
+        if self._statuses is not None:
+            matched: Set[str] = set()
+            for status in self._statuses:
+                matched |= index._by_status.get(status, set())
+            sets.append(matched)
+        for field, since, until in self._ranges:
+            sets.append(index._range(field, since, until))
+        if not sets:
+            return set(index._tasks)
+        sets.sort(key=len)
+        result = set(sets[0])
+        for other in sets[1:]:
+            result &= other
+        return result
+
+    def _ordered(self, ids: Set[str]) -> List[str]:
+        index = self._index
+        if self._order is None:
+            return sorted(ids, key=lambda task_id: index._keys[task_id].seq)
+        field, descending = self._order
+        entries = index._sorted(field)
+        if len(ids) * 4 < len(entries):
+            # Few candidates: sorting them is cheaper than a full scan.
+            present = [
+                (getattr(index._keys[task_id], field), task_id)
+                for task_id in ids
+                if not _missing(getattr(index._keys[task_id], field))
+            ]
+            present.sort(reverse=descending)
+            ordered = [task_id for _, task_id in present]
+        else:
+            scan = reversed(entries) if descending else iter(entries)
+            ordered = [
+                task_id for value, task_id in scan
+                if task_id in ids and not _missing(value)
+            ]
+        if len(ordered) < len(ids):
+            # Tasks without a value come last in either direction.
+            seen = set(ordered)
+            ordered.extend(sorted(
+                (task_id for task_id in ids if task_id not in seen),
+                key=lambda task_id: index._keys[task_id].seq,
+            ))
+        return ordered
+
+
+def _missing(value: Any) -> bool:
+    return value is None or value == NO_PRIORITY
@@ -1,7 +1,15 @@
-from typing import Any, Dict, List, Optional
-
-import iso8601
+import bisect
+import datetime
 import json
+from typing import (
+    Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union, overload,
+)
+
+
+def _parse_date(value: str) -> datetime.datetime:
+    # Deferred so that importing the model does not pull in ``iso8601``.
+    import iso8601
+    return iso8601.parse_date(value)
 
 
 class Task:
@@ -20,11 +28,12 @@ class Task:
         self.title = title
         self.target = target
         self.status = status
-        self.created = iso8601.parse_date(created) if created else None
-        self.modified = iso8601.parse_date(modified) if modified else None
+        self.priority = priority
+        self.created = _parse_date(created) if created else None
+        self.modified = _parse_date(modified) if modified else None
 
     def __str__(self) -> str:
-        return f'({self.id}, {self.title}, {self.target}, {self.status}, {self.created}, {self.modified})'
+        return f'({self.id}, {self.title}, {self.target}, {self.status}, {self.priority}, {self.created}, {self.modified})'
 
     def marshal_json(self) -> Dict[str, Any]:
         o = {}
@@ -35,6 +44,8 @@ class Task:
             o['targetLink'] = self.target
         if self.status:
             o['status'] = self.status
+        if self.priority:
+            o['priority'] = self.priority
         return o
 
     @classmethod
@@ -44,20 +55,364 @@ class Task:
             title=json['title'],
             target=json['targetLink'],
             status=json['status'],
+            priority=json.get('priority'),
             created=json['createdDate'],
             modified=json['modifiedDate'],
         )
 
 
+RANK_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+# Appending or prepending moves this many base 36 digits away from the
+# outermost rank, so repeated appends keep keys short.
+RANK_STEP_WIDTH = 4
+
+# A lane is renumbered once a rank key grows longer than this.
+MAX_RANK_LENGTH = 16
+
+
+def rank_between(lo: str, hi: Optional[str]) -> str:
+    """
+    Return a rank key that sorts strictly between ``lo`` and ``hi``.
+
+    Rank keys are the fractional digits of a number in ``[0, 1)`` written
+    in base 36 without trailing zeros, so string order equals numeric
+    order and there is always room between two keys. ``lo`` may be empty
+    for the lower bound and ``hi`` ``None`` for the upper bound.
+
+    Raises:
+        ValueError
+    """
+    if hi is not None and lo >= hi:
+        raise ValueError(f'{lo!r} does not sort before {hi!r}')
+    key = []
+    while True:
+        if hi is not None:
+            n = 0
+            while n < len(hi) and (lo[n] if n < len(lo) else '0') == hi[n]:
+                n += 1
+            key.append(hi[:n])
+            lo, hi = lo[n:], hi[n:]
+        digit_lo = RANK_DIGITS.index(lo[0]) if lo else 0
+        digit_hi = RANK_DIGITS.index(hi[0]) if hi is not None else len(RANK_DIGITS)
+        if digit_hi - digit_lo > 1:
+            key.append(RANK_DIGITS[(digit_lo + digit_hi + 1) // 2])
+            return ''.join(key)
+        if hi is not None and len(hi) > 1:
+            key.append(hi[:1])
+            return ''.join(key)
+        key.append(RANK_DIGITS[digit_lo])
+        lo, hi = lo[1:], None
+
+
+def rank_after(lo: str) -> str:
+    """
+    Return a rank key a fixed step after ``lo``, for appending.
+
+    Falls back to ``rank_between`` when there is no room for the step.
+    """
+    width = max(len(lo), RANK_STEP_WIDTH)
+    value = _rank_value(lo, width) + len(RANK_DIGITS) ** (width - RANK_STEP_WIDTH)
+    if value >= len(RANK_DIGITS) ** width:
+        return rank_between(lo, None)
+    return _rank_key(value, width)
+
+
+def rank_before(hi: str) -> str:
+    """
+    Return a rank key a fixed step before ``hi``, for prepending.
+
+    Falls back to ``rank_between`` when there is no room for the step.
+    """
+    width = max(len(hi), RANK_STEP_WIDTH)
+    value = _rank_value(hi, width) - len(RANK_DIGITS) ** (width - RANK_STEP_WIDTH)
+    if value <= 0:
+        return rank_between('', hi)
+    return _rank_key(value, width)
+
+
+def spread_ranks(n: int) -> List[str]:
+    """
+    Return ``n`` ascending rank keys of equal length, evenly spaced.
+    """
+    width = 1
+    while len(RANK_DIGITS) ** width <= 2 * n:
+        width += 1
+    step = len(RANK_DIGITS) ** width // (n + 1)
+    return [_rank_key(i * step, width) for i in range(1, n + 1)]
+
+
+def _rank_value(key: str, width: int) -> int:
+    return int(key.ljust(width, '0'), len(RANK_DIGITS)) if key else 0
+
+
+def _rank_key(value: int, width: int) -> str:
+    digits = []
+    for _ in range(width):
+        value, digit = divmod(value, len(RANK_DIGITS))
+        digits.append(RANK_DIGITS[digit])
+    return ''.join(reversed(digits)).rstrip('0')
+
+
+class Lane:
+    """
+    Ordered tasks of one plan lane.
+
+    Every task carries a sparse rank key (see ``rank_between``) and the
+    lane is kept sorted by rank. Inserting or moving a task locates its
+    neighbours by binary search and assigns a new rank to that task
+    alone; all other ranks stay untouched. Only when a key grows beyond
+    ``MAX_RANK_LENGTH`` characters, after many insertions into the same
+    gap, is the whole lane renumbered with ``spread_ranks``.
+
+    Tasks are kept in a sorted Python list: finding a position is
+    O(log n), but inserting or removing an entry shifts the entries
+    behind it, an O(n) memory move.
+
+    A lane supports the list operations callers use on plan lanes. Tasks
+    may be given either as ``Task`` objects or by task ID. Unlike a list,
+    a lane holds every task at most once, and looking up a missing task
+    raises ``KeyError``.
+    """
+
+    def __init__(self, tasks: Iterable[Task] = ()) -> None:
+        self._entries: List[Tuple[str, str]] = []
+        self._tasks: Dict[str, Task] = {}
+        self._ranks: Dict[str, str] = {}
+        self._reset(tasks)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[Task]:
+        return (self._tasks[task_id] for _, task_id in self._entries)
+
+    @overload
+    def __getitem__(self, index: int) -> Task:
+        ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Task]:
+        ...
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Task, List[Task]]:
+        if isinstance(index, slice):
+            return [self._tasks[task_id] for _, task_id in self._entries[index]]
+        return self._tasks[self._entries[index][1]]
+
+    def __setitem__(self, index: int, task: Task) -> None:
+        """
+        Replace the task at ``index``; the new task takes over its rank.
+
+        Raises:
+            ValueError
+        """
+        rank, old_id = self._entries[index]
+        if task.id != old_id and task.id in self._tasks:
+            raise ValueError(f'Task {task.id} is already in the lane.')
+        del self._entries[index]
+        del self._ranks[old_id]
+        del self._tasks[old_id]
+        self._add(rank, task)
+
+    def __delitem__(self, index: int) -> None:
+        self.remove(self._entries[index][1])
+
+    def __contains__(self, task: object) -> bool:
+        return _task_id(task) in self._tasks
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, (Lane, list)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __add__(self, other: Iterable[Task]) -> List[Task]:
+        return list(self) + list(other)
+
+    def __radd__(self, other: Iterable[Task]) -> List[Task]:
+        return list(other) + list(self)
+
+    def __iadd__(self, other: Iterable[Task]) -> 'Lane':
+        self.extend(other)
+        return self
+
+    def __repr__(self) -> str:
+        return f'Lane({list(self)!r})'
+
+    def rank(self, task: Union[Task, str]) -> str:
+        """
+        Raises:
+            KeyError
+        """
+        return self._ranks[_task_id(task)]
+
+    def index(self, task: Union[Task, str]) -> int:
+        """
+        Return the position of a task in the lane.
+
+        Raises:
+            KeyError
+        """
+        task_id = _task_id(task)
+        return bisect.bisect_left(self._entries, (self._ranks[task_id], task_id))
+
+    def insert(self, index: int, task: Task) -> str:
+        """
+        Insert a task before position ``index`` and return its rank.
+
+        Raises:
+            ValueError
+        """
+        if task.id in self._tasks:
+            raise ValueError(f'Task {task.id} is already in the lane.')
+        rank = self._rank_at(index)
+        self._add(rank, task)
+        if len(rank) > MAX_RANK_LENGTH:
+            self._reset(list(self))
+            rank = self._ranks[task.id]
+        return rank
+
+    def append(self, task: Task) -> str:
+        return self.insert(len(self), task)
+
+    def extend(self, tasks: Iterable[Task]) -> None:
+        """
+        Raises:
+            ValueError
+        """
+        for task in tasks:
+            self.append(task)
+
+    def remove(self, task: Union[Task, str]) -> int:
+        """
+        Remove a task and return the position it had.
+
+        Raises:
+            KeyError
+        """
+        task_id = _task_id(task)
+        index = self.index(task_id)
+        del self._entries[index]
+        del self._ranks[task_id]
+        del self._tasks[task_id]
+        return index
+
+    def pop(self, index: int = -1) -> Task:
+        """
+        Remove and return the task at ``index``.
+
+        Raises:
+            IndexError
+        """
+        task = self[index]
+        self.remove(task.id)
+        return task
+
+    def clear(self) -> None:
+        self._reset(())
+
+    def sort(self, key: Optional[Callable[[Task], Any]] = None, reverse: bool = False) -> None:
+        """
+        Sort the lane in place. Every task is given a new rank.
+        """
+        self._reset(sorted(self, key=key, reverse=reverse))  # type: ignore
+
+    def reverse(self) -> None:
+        """
+        Reverse the lane in place. Every task is given a new rank.
+        """
+        self._reset(reversed(list(self)))
+
+    def move(self, task: Union[Task, str], index: int) -> str:
+        """
+        Move a task so that it ends up at position ``index`` and return
+        its new rank. No other task's rank changes unless the lane has to
+        be renumbered.
+
+        Raises:
+            KeyError
+        """
+        task_id = _task_id(task)
+        moved = self._tasks[task_id]
+        if self.index(task_id) == index:
+            return self._ranks[task_id]
+        self.remove(task_id)
+        return self.insert(index, moved)
+
+    def ranks(self) -> Dict[str, str]:
+        """
+        Return the rank of every task by task ID.
+        """
+        return dict(self._ranks)
+
+    def marshal_json(self) -> List[Task]:
+        return list(self)
+
+    def _rank_at(self, index: int) -> str:
+        n = len(self._entries)
+        if index < 0:
+            index += n
+        index = max(0, min(n, index))
+        if n == 0:
+            return rank_between('', None)
+        if index == n:
+            return rank_after(self._entries[-1][0])
+        if index == 0:
+            return rank_before(self._entries[0][0])
+        return rank_between(self._entries[index - 1][0], self._entries[index][0])
+
+    def _add(self, rank: str, task: Task) -> None:
+        bisect.insort(self._entries, (rank, task.id))
+        self._ranks[task.id] = rank
+        self._tasks[task.id] = task
+
+    def _reset(self, tasks: Iterable[Task]) -> None:
+        tasks = list(tasks)
+        if len({task.id for task in tasks}) != len(tasks):
+            raise ValueError('A task may only appear once in a lane.')
+        self._entries = []
+        self._tasks = {}
+        self._ranks = {}
+        for rank, task in zip(spread_ranks(len(tasks)), tasks):
+            self._add(rank, task)
+
+
+def _task_id(task: object) -> Any:
+    return task.id if isinstance(task, Task) else task
+
+
+class _LaneField:
+    """
+    Plan attribute that stores any sequence of tasks as a ``Lane``.
+    """
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.attr = '_' + name
+
+    def __get__(self, obj: Any, objtype: Optional[type] = None) -> Any:
+        if obj is None:
+            return self
+        return getattr(obj, self.attr)
+
+    def __set__(self, obj: Any, tasks: Iterable[Task]) -> None:
+        setattr(obj, self.attr, tasks if isinstance(tasks, Lane) else Lane(tasks))
+
+
 class Plan:
 
+    done = _LaneField()
+    today = _LaneField()
+    todo = _LaneField()
+    blocked = _LaneField()
+    later = _LaneField()
+
     def __init__(
         self,
-        done: List[Task],
-        today: List[Task],
-        todo: List[Task],
-        blocked: List[Task],
-        later: List[Task],
+        done: Iterable[Task],
+        today: Iterable[Task],
+        todo: Iterable[Task],
+        blocked: Iterable[Task],
+        later: Iterable[Task],
     ) -> None:
         self.done = done
         self.today = today
@@ -86,16 +441,79 @@ class Plan:
                 raise ValueError
         return plan
 
+    def lane(self, status: str) -> Lane:
+        """
+        Return the ordered task lane for a task status.
+
+        Raises:
+            ValueError
+        """
+        if status == 'Done':
+            return self.done
+        elif status == 'Today':
+            return self.today
+        elif status == 'Todo':
+            return self.todo
+        elif status == 'Blocked':
+            return self.blocked
+        elif status == 'Later':
+            return self.later
+        else:
+            raise ValueError
+
     def marshal_json(self) -> Dict[str, Any]:
         o = {}
-        o['done'] = self.done
-        o['today'] = self.today
-        o['todo'] = self.todo
-        o['blocked'] = self.blocked
-        o['later'] = self.later
+        o['done'] = list(self.done)
+        o['today'] = list(self.today)
+        o['todo'] = list(self.todo)
+        o['blocked'] = list(self.blocked)
+        o['later'] = list(self.later)
         return o
 
 
+class Event:
+    """
+    A change to the task storage as reported by the server's change feed.
+
+    ``kind`` is one of ``TaskCreated``, ``TaskUpdated``, ``TaskDeleted`` or
+    ``PlanUpdated``. Task events carry the task (or only its ID when it was
+    deleted) and optionally its ``index`` within its plan lane; plan events
+    carry the complete plan.
+    """
+
+    def __init__(
+        self,
+        offset: int,
+        kind: str,
+        task: Optional[Task] = None,
+        task_id: Optional[str] = None,
+        index: Optional[int] = None,
+        plan: Optional[Plan] = None,
+    ) -> None:
+        self.offset = offset
+        self.kind = kind
+        self.task = task
+        self.task_id = task_id if task_id is not None or task is None else task.id
+        self.index = index
+        self.plan = plan
+
+    def __str__(self) -> str:
+        return f'({self.offset}, {self.kind}, {self.task_id})'
+
+    @classmethod
+    def unmarshal_json(cls, json: Dict[str, Any]) -> 'Event':
+        task = json.get('task')
+        plan = json.get('plan')
+        return cls(
+            offset=json['offset'],
+            kind=json['kind'],
+            task=Task.unmarshal_json(task) if task else None,
+            task_id=json.get('taskId'),
+            index=json.get('index'),
+            plan=Plan.unmarshal_json(plan) if plan else None,
+        )
+
+
 class Encoder(json.JSONEncoder):
 
     def default(self, obj: Any) -> Any:
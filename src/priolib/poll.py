@@ -0,0 +1,246 @@
+import concurrent.futures
+import hashlib
+import json
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from .client import APIClient
+from .model import Encoder, Plan, Task
+
+
+log = logging.getLogger(__name__)
+
+Snapshot = Union[Plan, List[Task]]
+
+
+class Diff:
+    """
+    Changes between two polls as seen by one subscriber.
+
+    ``value`` is the complete ``Plan`` or task list of the latest poll.
+    ``reordered`` is set when the payload changed without any task being
+    added, changed or removed, e.g. when tasks were moved within a lane.
+    """
+
+    def __init__(
+        self,
+        value: Snapshot,
+        added: List[Task],
+        changed: List[Task],
+        removed: List[str],
+        reordered: bool = False,
+    ) -> None:
+        self.value = value
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+        self.reordered = reordered
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.changed or self.removed or self.reordered)
+
+
+def _tasks(value: Snapshot) -> List[Task]:
+    if isinstance(value, Plan):
+        tasks: List[Task] = []
+        for status in ('Done', 'Today', 'Todo', 'Blocked', 'Later'):
+            tasks.extend(value.lane(status))
+        return tasks
+    return list(value)
+
+
+def _fingerprint(task: Task) -> str:
+    return f'{task.modified}|{json.dumps(task, cls=Encoder, sort_keys=True)}'
+
+
+class _Subscription:
+
+    def __init__(self, callback: Callable[[Diff], None]) -> None:
+        self.callback = callback
+        self.seen: Dict[str, str] = {}
+        self.digest: Optional[str] = None
+
+    def diff(
+        self,
+        value: Snapshot,
+        tasks: List[Task],
+        prints: Dict[str, str],
+        digest: str,
+    ) -> Diff:
+        added = []
+        changed = []
+        for task in tasks:
+            old = self.seen.get(task.id)
+            if old is None:
+                added.append(task)
+            elif old != prints[task.id]:
+                changed.append(task)
+        removed = [task_id for task_id in self.seen if task_id not in prints]
+        diff = Diff(value, added, changed, removed)
+        diff.reordered = not diff and self.digest is not None and self.digest != digest
+        self.seen = prints
+        self.digest = digest
+        return diff
+
+
+class Poller:
+    """
+    Poll ``get_plan`` or ``list_tasks`` at an interval that follows the
+    observed rate of change.
+
+    The interval shrinks towards the average time between changes, as
+    derived from ``Task.modified``, when changes are seen and grows by
+    ``backoff`` while nothing changes, always bounded by ``min_interval``
+    and ``max_interval`` and spread by ``jitter``.
+
+    All subscribers share one poller: concurrent ``poll`` calls are
+    collapsed into a single request and every subscriber receives only
+    the ``Diff`` against what it has seen before.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], Snapshot],
+        min_interval: float = 1,
+        max_interval: float = 60,
+        jitter: float = 0.1,
+        backoff: float = 1.5,
+    ) -> None:
+        if not 0 < min_interval <= max_interval:
+            raise ValueError
+        self.fetch = fetch
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.jitter = jitter
+        self.backoff = backoff
+        self.interval = min_interval
+        self.digest: Optional[str] = None
+        self._change_gap: Optional[float] = None
+        self._last_change: Optional[float] = None
+        self._lock = threading.Lock()
+        self._inflight: Optional[concurrent.futures.Future] = None
+        self._subscriptions: List[_Subscription] = []
+
+    @classmethod
+    def plan(cls, api: APIClient, **kwargs: Any) -> 'Poller':
+        return cls(api.get_plan, **kwargs)
+
+    @classmethod
+    def tasks(cls, api: APIClient, **kwargs: Any) -> 'Poller':
+        return cls(api.list_tasks, **kwargs)
+
+    def subscribe(self, callback: Callable[[Diff], None]) -> Callable[[], None]:
+        """
+        Deliver diffs to ``callback`` from the next poll on.
+
+        The first diff a subscriber receives lists every task as added.
+        Returns a function that removes the subscription again.
+        """
+        subscription = _Subscription(callback)
+        with self._lock:
+            self._subscriptions.append(subscription)
+
+        def unsubscribe() -> None:
+            with self._lock:
+                if subscription in self._subscriptions:
+                    self._subscriptions.remove(subscription)
+        return unsubscribe
+
+    def poll(self) -> bool:
+        """
+        Fetch once, notify subscribers and adapt the interval.
+
+        Callers arriving while a poll is in flight wait for and share its
+        outcome instead of issuing another request. Returns whether the
+        payload changed since the previous poll.
+        """
+        with self._lock:
+            inflight = self._inflight
+            if inflight is None:
+                self._inflight = concurrent.futures.Future()
+        if inflight is not None:
+            return inflight.result()
+        future = self._inflight
+        try:
+            changed = self._poll()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(changed)
+            return changed
+        finally:
+            with self._lock:
+                self._inflight = None
+
+    def delay(self) -> float:
+        """
+        Return the current interval with jitter applied.
+        """
+        spread = self.interval * self.jitter
+        return max(0.0, self.interval + random.uniform(-spread, spread))
+
+    def run(self, stop: threading.Event) -> None:
+        """
+        Poll until ``stop`` is set.
+        """
+        while not stop.is_set():
+            try:
+                self.poll()
+            except Exception:
+                log.exception('Poll failed')
+            stop.wait(self.delay())
+
+    def _poll(self) -> bool:
+        value = self.fetch()
+        tasks = _tasks(value)
+        payload = json.dumps(value, cls=Encoder, sort_keys=True)
+        hasher = hashlib.sha1(payload.encode())
+        # The marshalled payload carries no dates: hash them alongside.
+        for task in tasks:
+            hasher.update(str(task.modified).encode())
+        digest = hasher.hexdigest()
+        first = self.digest is None
+        changed = not first and digest != self.digest
+        self.digest = digest
+        if first:
+            self._last_change = self._changed_at(tasks)
+        else:
+            self._adapt(changed, tasks)
+
+        prints = {task.id: _fingerprint(task) for task in tasks}
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            diff = subscription.diff(value, tasks, prints, digest)
+            if not diff:
+                continue
+            try:
+                subscription.callback(diff)
+            except Exception:
+                log.exception('Poll subscriber failed')
+        return changed
+
+    def _adapt(self, changed: bool, tasks: List[Task]) -> None:
+        if not changed:
+            self.interval = min(self.max_interval, self.interval * self.backoff)
+            return
+        at = self._changed_at(tasks)
+        if self._last_change is not None and at > self._last_change:
+            gap = at - self._last_change
+            if self._change_gap is None:
+                self._change_gap = gap
+            else:
+                self._change_gap = 0.7 * self._change_gap + 0.3 * gap
+        self._last_change = at
+        target = self._change_gap / 2 if self._change_gap else self.min_interval
+        self.interval = max(self.min_interval, min(self.max_interval, target))
+
+    def _changed_at(self, tasks: List[Task]) -> float:
+        # Prefer when the last change happened over when it was noticed.
+        now = time.time()
+        modified = [t.modified for t in tasks if t.modified is not None]
+        return min(now, max(modified).timestamp()) if modified else now
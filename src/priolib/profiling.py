@@ -0,0 +1,202 @@
+"""
+Cumulative timing of the request and model hot paths.
+
+Stages recorded by priolib:
+
+``transport``
+    Sending the request and receiving the response headers.
+``body``
+    Reading the response body.
+``decode``
+    Parsing the response body as JSON.
+``model``
+    Building ``Task`` and ``Plan`` objects from decoded JSON.
+``encode``
+    Serializing models to JSON with ``Encoder``.
+
+Profiling is off by default and then costs one flag check per stage. It
+is switched on for a block of code with ``profiling()`` or for the whole
+process by setting ``PRIOLIB_PROFILE=1``; ``PRIOLIB_PROFILE_FILE`` then
+additionally samples stacks and writes them to that file on exit.
+"""
+import atexit
+import collections
+import contextlib
+import os
+import sys
+import threading
+import time
+from typing import Any, Counter, Dict, Iterator, Optional, Tuple
+
+
+ENV_VAR = 'PRIOLIB_PROFILE'
+FILE_ENV_VAR = 'PRIOLIB_PROFILE_FILE'
+
+_enabled = 0
+_lock = threading.Lock()
+_stats: Dict[str, Tuple[int, float]] = {}
+
+
+class _NullStage:
+
+    def __enter__(self) -> None:
+        pass
+
+    def __exit__(self, *exc: Any) -> None:
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc: Any) -> None:
+        elapsed = time.perf_counter() - self.start
+        with _lock:
+            calls, total = _stats.get(self.name, (0, 0.0))
+            _stats[self.name] = (calls + 1, total + elapsed)
+
+
+def stage(name: str) -> Any:
+    """
+    Return a context manager timing the enclosed code as stage ``name``.
+    """
+    if not _enabled:
+        return _NULL_STAGE
+    return _Stage(name)
+
+
+def enabled() -> bool:
+    return _enabled > 0
+
+
+def enable() -> None:
+    global _enabled
+    with _lock:
+        _enabled += 1
+
+
+def disable() -> None:
+    global _enabled
+    with _lock:
+        _enabled = max(0, _enabled - 1)
+
+
+def stats() -> Dict[str, Tuple[int, float]]:
+    """
+    Return ``(calls, cumulative seconds)`` recorded so far for every stage.
+    """
+    with _lock:
+        return dict(_stats)
+
+
+def reset() -> None:
+    with _lock:
+        _stats.clear()
+
+
+def report() -> str:
+    """
+    Format the recorded stages as a table, slowest first.
+    """
+    lines = [f'{"stage":<10} {"calls":>8} {"total s":>10} {"mean ms":>10}']
+    for name, (calls, total) in sorted(stats().items(), key=lambda i: -i[1][1]):
+        lines.append(f'{name:<10} {calls:>8} {total:>10.4f} {total / calls * 1000:>10.3f}')
+    return '\n'.join(lines)
+
+
+class Sampler:
+    """
+    Periodically sample the stacks of all other threads.
+
+    Samples are aggregated as collapsed stacks, one line per distinct
+    stack followed by its sample count, the input format of common flame
+    graph tools.
+    """
+
+    def __init__(self, interval: float = 0.005) -> None:
+        self.interval = interval
+        self.samples: Counter[str] = collections.Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name='priolib-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.samples.most_common():
+                f.write(f'{stack} {count}\n')
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                names = []
+                while frame is not None:
+                    code = frame.f_code
+                    names.append(f'{code.co_filename}:{code.co_name}')
+                    frame = frame.f_back
+                self.samples[';'.join(reversed(names))] += 1
+
+
+@contextlib.contextmanager
+def profiling(
+    sample_file: Optional[str] = None,
+    interval: float = 0.005,
+) -> Iterator[None]:
+    """
+    Record stage timings while the block runs.
+
+    With ``sample_file`` stacks are also sampled every ``interval``
+    seconds and written to the file when the block exits.
+    """
+    sampler = Sampler(interval) if sample_file else None
+    enable()
+    if sampler is not None:
+        sampler.start()
+    try:
+        yield
+    finally:
+        disable()
+        if sampler is not None and sample_file is not None:
+            sampler.stop()
+            sampler.dump(sample_file)
+
+
+def _from_environment() -> None:
+    if os.environ.get(ENV_VAR, '') in ('', '0'):
+        return
+    enable()
+    sample_file = os.environ.get(FILE_ENV_VAR)
+    if sample_file:
+        sampler = Sampler()
+        sampler.start()
+
+        def dump() -> None:
+            sampler.stop()
+            sampler.dump(sample_file)
+        atexit.register(dump)
+
+
+_from_environment()
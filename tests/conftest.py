@@ -0,0 +1,24 @@
+from typing import Any, List
+
+import pytest
+
+
+def pytest_addoption(parser: Any) -> None:
+    parser.addoption(
+        '--benchmark', action='store_true', default=False,
+        help='run wall-clock benchmarks',
+    )
+
+
+def pytest_configure(config: Any) -> None:
+    config.addinivalue_line(
+        'markers', 'benchmark: wall-clock benchmark, only run with --benchmark')
+
+
+def pytest_collection_modifyitems(config: Any, items: List[Any]) -> None:
+    if config.getoption('--benchmark'):
+        return
+    skip = pytest.mark.skip(reason='benchmark, run with --benchmark')
+    for item in items:
+        if 'benchmark' in item.keywords:
+            item.add_marker(skip)
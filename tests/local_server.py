@@ -0,0 +1,104 @@
+"""
+Local HTTP servers for tests that need real sockets.
+"""
+import contextlib
+import http.server
+import json
+import threading
+import time
+from http import HTTPStatus
+from typing import Any, Iterator, Type
+
+
+class TaskHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Answer every GET with the task named by the last path segment.
+    """
+
+    latency = 0.02
+
+    def do_GET(self) -> None:
+        time.sleep(self.latency)
+        self.send_json({
+            'createdDate': '2007-01-25T12:00:00Z',
+            'id': self.path.split('/')[-1],
+            'modifiedDate': '2007-01-25T12:00:00Z',
+            'title': 'Stress task',
+            'targetLink': 'https://example.com',
+            'status': 'Today',
+        })
+
+    def send_json(self, payload: Any) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(HTTPStatus.OK.value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+class SlowHandler(TaskHandler):
+
+    latency = 2
+
+
+class CollectionHandler(TaskHandler):
+    """
+    Answer every GET with an empty task collection.
+    """
+
+    latency = 0.01
+
+    def do_GET(self) -> None:
+        time.sleep(self.latency)
+        self.send_json({'kind': 'Collection', 'contents': []})
+
+
+class Server(http.server.ThreadingHTTPServer):
+
+    daemon_threads = True
+    request_queue_size = 64
+
+
+class SerialServer(http.server.HTTPServer):
+    """
+    Server handling one request at a time, like a single worker.
+    """
+
+    request_queue_size = 64
+
+
+def start(
+    handler: Type[http.server.BaseHTTPRequestHandler],
+    server_class: Type[http.server.HTTPServer] = Server,
+) -> http.server.HTTPServer:
+    server = server_class(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def stop(server: http.server.HTTPServer) -> None:
+    server.shutdown()
+    server.server_close()
+
+
+def addr(server: http.server.HTTPServer) -> str:
+    return f'http://127.0.0.1:{server.server_address[1]}'
+
+
+@contextlib.contextmanager
+def serving(
+    handler: Type[http.server.BaseHTTPRequestHandler],
+    server_class: Type[http.server.HTTPServer] = Server,
+) -> Iterator[str]:
+    """
+    Run a server for the duration of the block and yield its address.
+    """
+    server = start(handler, server_class)
+    try:
+        yield addr(server)
+    finally:
+        stop(server)
@@ -0,0 +1,170 @@
+import concurrent.futures
+import time
+from http.server import HTTPServer
+from typing import Iterator, List, Optional
+
+import pytest
+import responses
+
+from priolib.balance import Balancer
+from priolib.client import APIClient, APIError
+
+from local_server import CollectionHandler, SerialServer, addr, start, stop
+
+
+def _throughput(api: APIClient, workers: int, calls: int) -> float:
+    began = time.perf_counter()
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        list(pool.map(lambda _: api.list_tasks(), range(calls)))
+    return calls / (time.perf_counter() - began)
+
+
+class TestBalancer:
+
+    def test_round_robin(self) -> None:
+        balancer = Balancer(['a', 'b', 'c'])
+        picked = []
+        for _ in range(6):
+            endpoint = balancer.acquire()
+            picked.append(endpoint.addr)
+            balancer.release(endpoint, 0.01, True)
+        assert picked == ['a', 'b', 'c', 'a', 'b', 'c']
+
+    def test_least_outstanding(self) -> None:
+        balancer = Balancer(['a', 'b', 'c'], strategy='least_outstanding')
+        first = [balancer.acquire() for _ in range(3)]
+        assert sorted(e.addr for e in first) == ['a', 'b', 'c']
+        balancer.release(first[1], 0.01, True)
+        assert balancer.acquire() is first[1]
+
+    def test_exclude(self) -> None:
+        balancer = Balancer(['a', 'b'])
+        a = balancer.endpoints[0]
+        assert all(balancer.acquire(exclude=[a]).addr == 'b' for _ in range(4))
+        assert balancer.acquire(exclude=balancer.endpoints).addr in ('a', 'b')
+
+    def test_ejection(self) -> None:
+        balancer = Balancer(['a', 'b'], eject_after=2, eject_time=0.1)
+        a, b = balancer.endpoints
+        balancer.release(balancer.acquire(pin=a), None, False)
+        assert a in balancer.healthy()
+        balancer.release(balancer.acquire(pin=a), None, False)
+        assert balancer.healthy() == [b]
+        assert all(balancer.acquire().addr == 'b' for _ in range(4))
+        time.sleep(0.1)
+        assert a in balancer.healthy()
+        # A returning endpoint is ejected again on its first failure, for longer.
+        balancer.release(balancer.acquire(pin=a), None, False)
+        assert a.ejected_until - time.monotonic() > 0.15
+        balancer.release(balancer.acquire(pin=a), 0.01, True)
+        assert a in balancer.healthy()
+
+    def test_all_ejected(self) -> None:
+        balancer = Balancer(['a', 'b'], eject_after=1, eject_time=10)
+        a, b = balancer.endpoints
+        balancer.release(balancer.acquire(pin=a), None, False)
+        balancer.release(balancer.acquire(pin=b), None, False)
+        assert balancer.healthy() == []
+        assert balancer.acquire() is a
+
+    def test_invalid(self) -> None:
+        with pytest.raises(ValueError):
+            Balancer([])
+        with pytest.raises(ValueError):
+            Balancer(['a'], strategy='random')
+
+
+class TestMultiEndpointClient:
+
+    @responses.activate
+    def test_idempotent_retry_on_other_endpoint(self) -> None:
+        api = APIClient(addr=['https://a.taskpr.io', 'https://b.taskpr.io'])
+        responses.add(responses.GET, 'https://a.taskpr.io/plan', status=503)
+        responses.add(
+            responses.GET, 'https://b.taskpr.io/plan',
+            json={'contents': []},
+        )
+        for _ in range(4):
+            api.get_plan()
+        assert api.balancer is not None
+        a, b = api.balancer.endpoints
+        assert a.errors >= 1
+        # Every call succeeded through b, a was tried at most once per call.
+        assert b.errors == 0
+
+    @responses.activate
+    def test_non_idempotent_stays_on_endpoint(self) -> None:
+        api = APIClient(addr=['https://a.taskpr.io', 'https://b.taskpr.io'])
+        responses.add(responses.POST, 'https://a.taskpr.io/tasks', status=500)
+        responses.add(responses.POST, 'https://b.taskpr.io/tasks', status=500)
+        with pytest.raises(APIError):
+            api.create_task(title='First task', target='https://example.com')
+        hosts = {call.request.url.split('/')[2] for call in responses.calls}
+        assert len(responses.calls) == 3
+        assert len(hosts) == 1
+
+    def test_single_endpoint_has_no_balancer(self) -> None:
+        assert APIClient(addr='https://api.taskpr.io').balancer is None
+        assert APIClient(addr=['https://api.taskpr.io']).balancer is None
+
+    def test_no_endpoint(self) -> None:
+        with pytest.raises(ValueError):
+            APIClient(addr=[])
+
+
+class TestMultiEndpointServers:
+
+    @pytest.fixture()
+    def servers(self) -> Iterator[List[HTTPServer]]:
+        servers = [start(CollectionHandler, SerialServer) for _ in range(3)]
+        yield servers
+        for server in servers:
+            stop(server)
+
+    @pytest.mark.benchmark
+    @pytest.mark.parametrize('strategy', ['round_robin', 'least_outstanding'])
+    def test_throughput(self, servers: List[HTTPServer], strategy: str) -> None:
+        single = APIClient(addr=addr(servers[0]))
+        multi = APIClient(addr=[addr(s) for s in servers], balancing=strategy)
+        _throughput(multi, 6, 12)
+
+        one = _throughput(single, 6, 60)
+        three = _throughput(multi, 6, 60)
+        print(f'\n{strategy}: 1 server {one:.0f} req/s, 3 servers {three:.0f} req/s')
+        assert three > 1.8 * one
+        assert all(e.errors == 0 for e in multi.balancer.endpoints)
+
+    def test_failover(self, servers: List[HTTPServer]) -> None:
+        api = APIClient(addr=[addr(s) for s in servers])
+        dead = _failover(api, servers)
+        ejected = [e for e in api.balancer.endpoints if e not in api.balancer.healthy()]
+        assert [e.addr for e in ejected] == [dead]
+
+    @pytest.mark.benchmark
+    def test_failover_latency(self, servers: List[HTTPServer]) -> None:
+        api = APIClient(addr=[addr(s) for s in servers])
+        latencies: List[float] = []
+        _failover(api, servers, latencies)
+        worst = max(latencies)
+        print(f'\nfailover: slowest call {worst * 1000:.1f} ms, '
+              f'{len(latencies)} calls in {sum(latencies):.2f}s')
+        assert worst < 0.5
+
+
+def _failover(
+    api: APIClient,
+    servers: List[HTTPServer],
+    latencies: Optional[List[float]] = None,
+) -> str:
+    """
+    Stop one of the servers and keep calling; return the stopped address.
+    """
+    _throughput(api, 3, 9)
+    dead = servers.pop()
+    stop(dead)
+    for _ in range(30):
+        call = time.perf_counter()
+        api.list_tasks()
+        if latencies is not None:
+            latencies.append(time.perf_counter() - call)
+    return addr(dead)
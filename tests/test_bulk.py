@@ -0,0 +1,179 @@
+import gzip
+import io
+import json
+import os
+from http import HTTPStatus
+from typing import Any, Dict, List, Tuple
+
+import pytest
+import responses
+
+from priolib.bulk import export_tasks, import_tasks, read_tasks
+from priolib.cli import main
+from priolib.client import APIClient, APIError
+
+ADDR = 'https://api.taskpr.io'
+
+
+def task_json(n: int) -> Dict[str, Any]:
+    return {
+        'createdDate': '2007-01-25T12:00:00+00:00',
+        'id': f'id-{n}',
+        'modifiedDate': '2007-01-25T12:00:00+00:00',
+        'targetLink': f'https://example.com/{n}',
+        'title': f'Task {n}',
+        'status': 'Todo',
+        'priority': None,
+    }
+
+
+def write_ndjson(path: str, count: int) -> None:
+    with open(path, 'w') as f:
+        for n in range(1, count + 1):
+            f.write(json.dumps(task_json(n)) + '\n')
+
+
+class Creator:
+    """
+    Accept task creations, failing the ones whose title is in ``fail``.
+    """
+
+    def __init__(self, fail: Tuple[str, ...] = ()) -> None:
+        self.fail = fail
+        self.titles: List[str] = []
+
+    def __call__(self, request: Any) -> Tuple[int, Dict[str, str], str]:
+        title = json.loads(request.body)['title']
+        if title in self.fail:
+            return (HTTPStatus.INTERNAL_SERVER_ERROR.value, {}, '')
+        self.titles.append(title)
+        return (HTTPStatus.CREATED.value, {'Location': f'{ADDR}/tasks/x'}, '')
+
+
+class TestExport:
+
+    @pytest.mark.parametrize('name', ['tasks.ndjson', 'tasks.ndjson.gz'])
+    @responses.activate
+    def test_export(self, tmpdir: Any, name: str) -> None:
+        responses.add(
+            responses.GET, f'{ADDR}/tasks',
+            json={'contents': [task_json(1), task_json(2)]},
+        )
+        path = str(tmpdir.join(name))
+        assert export_tasks(APIClient(addr=ADDR), path) == 2
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(path, 'rt') as f:
+            lines = [json.loads(line) for line in f]
+        assert lines == [task_json(1), task_json(2)]
+        assert [task['id'] for _, task in read_tasks(path)] == ['id-1', 'id-2']
+
+
+class TestImport:
+
+    @responses.activate
+    def test_parallel_import(self, tmpdir: Any) -> None:
+        path = str(tmpdir.join('tasks.ndjson'))
+        write_ndjson(path, 50)
+        creator = Creator()
+        responses.add_callback(responses.POST, f'{ADDR}/tasks', callback=creator)
+        reported = []
+        stats = import_tasks(
+            APIClient(addr=ADDR), path, concurrency=4, progress=reported.append)
+        assert stats.imported == 50
+        assert stats.rate > 0
+        assert sorted(creator.titles) == sorted(f'Task {n}' for n in range(1, 51))
+        assert reported
+
+    @responses.activate
+    def test_resume_from_checkpoint(self, tmpdir: Any) -> None:
+        path = str(tmpdir.join('tasks.ndjson'))
+        checkpoint = str(tmpdir.join('checkpoint'))
+        write_ndjson(path, 10)
+        api = APIClient(addr=ADDR, retries=1)
+
+        creator = Creator(fail=('Task 4',))
+        responses.add_callback(responses.POST, f'{ADDR}/tasks', callback=creator)
+        with pytest.raises(APIError):
+            import_tasks(api, path, concurrency=1, checkpoint=checkpoint)
+        with open(checkpoint) as f:
+            assert json.load(f) == {'line': 3}
+        # Uploads queued behind the failed one may still have completed.
+        assert creator.titles[:3] == ['Task 1', 'Task 2', 'Task 3']
+        assert 'Task 4' not in creator.titles
+
+        creator.fail = ()
+        creator.titles = []
+        stats = import_tasks(api, path, concurrency=3, checkpoint=checkpoint)
+        assert stats.skipped == 3
+        assert stats.imported == 7
+        assert sorted(creator.titles) == sorted(f'Task {n}' for n in range(4, 11))
+        with open(checkpoint) as f:
+            assert json.load(f) == {'line': 10}
+
+    @responses.activate
+    def test_priority(self, tmpdir: Any) -> None:
+        path = str(tmpdir.join('tasks.ndjson'))
+        with open(path, 'w') as f:
+            f.write(json.dumps(dict(task_json(1), priority='2')) + '\n')
+            f.write(json.dumps(task_json(2)) + '\n')
+        creator = Creator()
+        responses.add_callback(responses.POST, f'{ADDR}/tasks', callback=creator)
+        responses.add(
+            responses.PATCH, f'{ADDR}/tasks/x',
+            status=HTTPStatus.NO_CONTENT.value,
+        )
+        assert import_tasks(APIClient(addr=ADDR), path).imported == 2
+        patches = [c for c in responses.calls if c.request.method == 'PATCH']
+        assert len(patches) == 1
+        assert json.loads(patches[0].request.body) == {'id': 'x', 'priority': '2'}
+
+
+class TestCLI:
+
+    @responses.activate
+    def test_export_import(self, tmpdir: Any) -> None:
+        responses.add(responses.GET, f'{ADDR}/tasks', json={'contents': [task_json(1)]})
+        creator = Creator()
+        responses.add_callback(responses.POST, f'{ADDR}/tasks', callback=creator)
+        path = str(tmpdir.join('tasks.ndjson.gz'))
+        assert main(['--addr', ADDR, 'export', path]) == 0
+        assert os.path.getsize(path) > 0
+        assert main(['--addr', ADDR, 'import', path, '--concurrency', '2']) == 0
+        assert creator.titles == ['Task 1']
+
+    def test_missing_addr(self, monkeypatch: Any) -> None:
+        monkeypatch.delenv('PRIOLIB_ADDR', raising=False)
+        with pytest.raises(SystemExit):
+            main(['export', '-'])
+
+    @responses.activate
+    def test_gzip_stdio(self, monkeypatch: Any) -> None:
+        responses.add(responses.GET, f'{ADDR}/tasks', json={'contents': [task_json(1)]})
+        creator = Creator()
+        responses.add_callback(responses.POST, f'{ADDR}/tasks', callback=creator)
+        stdout = io.TextIOWrapper(io.BytesIO())
+        monkeypatch.setattr('sys.stdout', stdout)
+        assert main(['--addr', ADDR, 'export', '-', '--gzip']) == 0
+        stdout.flush()
+        data = stdout.buffer.getvalue()
+        assert json.loads(gzip.decompress(data)) == task_json(1)
+
+        monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(data)))
+        assert main(['--addr', ADDR, 'import', '-', '--gzip']) == 0
+        assert creator.titles == ['Task 1']
+
+    @pytest.mark.parametrize('line', [
+        '{"title": ',
+        '[1, 2]',
+        '{"title": "Task 1"}',
+        '{"title": "Task 1", "targetLink": null}',
+    ])
+    @responses.activate
+    def test_malformed_input(self, tmpdir: Any, capsys: Any, line: str) -> None:
+        responses.add_callback(responses.POST, f'{ADDR}/tasks', callback=Creator())
+        path = str(tmpdir.join('tasks.ndjson'))
+        with open(path, 'w') as f:
+            f.write(json.dumps(task_json(1)) + '\n')
+            f.write(line + '\n')
+        assert main(['--addr', ADDR, 'import', path]) == 1
+        assert 'line 2' in capsys.readouterr().err
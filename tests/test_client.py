@@ -1,13 +1,22 @@
+import concurrent.futures
 import datetime
+import gc
+import multiprocessing
+import os
+import threading
+import time
 import uuid
+from typing import Dict, Iterator, List, Tuple
 
 import pytest
 import responses
 from http import HTTPStatus
 
-from priolib.client import APIClient, APIError
+from priolib.client import APIClient, APIError, Deadline, DeadlineExceeded
 from priolib.model import Plan, Task
 
+from local_server import SlowHandler, TaskHandler, serving
+
 
 def generate_task_id() -> str:
     return str(uuid.uuid4())
@@ -109,6 +118,7 @@ class TestAPIClient:
         assert len(responses.calls) == 3
         assert responses.calls[0].request.url == f'{api.addr}/tasks/{test_id}'
         assert exc.value.reason == 'Not Found'
+        assert exc.value.status == HTTPStatus.NOT_FOUND
         assert exc.value.message == 'Task not found.'
         assert exc.value.details == 'Task does not exist in task storage.'
 
@@ -419,3 +429,168 @@ class TestAPIClient:
         assert len(responses.calls) == 1
         url = f'{api.addr}/plan'
         assert responses.calls[0].request.url == url
+
+
+def _hammer(api: APIClient, calls: int) -> int:
+    ok = 0
+    for _ in range(calls):
+        task_id = generate_task_id()
+        if api.get_task(task_id=task_id).id == task_id:
+            ok += 1
+    return ok
+
+
+def _hammer_threads(api: APIClient, workers: int, calls: int) -> List[int]:
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(lambda _: _hammer(api, calls), range(workers)))
+
+
+class TestConcurrency:
+
+    @pytest.fixture()
+    def server(self) -> Iterator[str]:
+        with serving(TaskHandler) as addr:
+            yield addr
+
+    def test_session_per_thread(self) -> None:
+        api = APIClient(addr='https://api.taskpr.io')
+        sessions = []
+        threads = [
+            threading.Thread(target=lambda: sessions.append(api.http.session))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len({id(s) for s in sessions}) == 4
+        assert api.http.session is api.http.session
+
+    def test_sessions_released_with_threads(self) -> None:
+        api = APIClient(addr='https://api.taskpr.io')
+        for _ in range(50):
+            t = threading.Thread(target=lambda: api.http.session)
+            t.start()
+            t.join()
+        gc.collect()
+        assert len(api.http._sessions) < 5
+        session = api.http.session
+        api.close()
+        assert len(api.http._sessions) == 0
+        assert api.http.session is session
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork()')
+    def test_session_recreated_after_fork(self) -> None:
+        api = APIClient(addr='https://api.taskpr.io')
+        parent = api.http.session
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+        child = ctx.Process(target=lambda: queue.put(
+            api.http.session is not parent and api.http.session is api.http.session))
+        child.start()
+        assert queue.get(timeout=10)
+        child.join()
+        assert api.http.session is parent
+
+    def test_threads_stress(self, server: str) -> None:
+        api = APIClient(addr=server)
+        assert _hammer_threads(api, 8, 10) == [10] * 8
+        api.close()
+
+    @pytest.mark.benchmark
+    def test_threads_speedup(self, server: str) -> None:
+        api = APIClient(addr=server)
+        calls = 10
+        _hammer(api, 2)
+
+        start = time.perf_counter()
+        assert _hammer(api, calls) == calls
+        serial = time.perf_counter() - start
+
+        workers = 8
+        start = time.perf_counter()
+        assert _hammer_threads(api, workers, calls) == [calls] * workers
+        parallel = time.perf_counter() - start
+        api.close()
+
+        print(f'\n{calls} calls: serial {serial:.2f}s, {workers} threads {parallel:.2f}s')
+        # Eight times the work should take well under eight times as long.
+        assert parallel < serial * workers / 2
+
+    @pytest.mark.skipif(not hasattr(os, 'fork'), reason='requires fork()')
+    def test_processes_stress(self, server: str) -> None:
+        api = APIClient(addr=server)
+        assert _hammer(api, 2) == 2
+        ctx = multiprocessing.get_context('fork')
+        queue = ctx.Queue()
+        children = [
+            ctx.Process(target=lambda: queue.put(_hammer(api, 20)))
+            for _ in range(4)
+        ]
+        for child in children:
+            child.start()
+        results = [queue.get(timeout=30) for _ in children]
+        for child in children:
+            child.join()
+        assert results == [20] * 4
+        assert _hammer(api, 2) == 2
+
+
+class TestDeadline:
+
+    @pytest.fixture()
+    def slow_server(self) -> Iterator[str]:
+        with serving(SlowHandler) as addr:
+            yield addr
+
+    @responses.activate
+    def test_deadline_covers_retries_and_backoff(self) -> None:
+        api = APIClient(addr='https://api.taskpr.io', retries=10, backoff=0.1)
+        responses.add(
+            method=responses.GET,
+            url=f'{api.addr}/plan',
+            status=HTTPStatus.SERVICE_UNAVAILABLE.value,
+        )
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded) as exc:
+            api.get_plan(deadline=Deadline(0.5))
+        assert exc.value.__cause__ is not None
+        assert time.monotonic() - start < 0.8
+        # Backoff of 0.1, 0.2 and 0.4 seconds leaves room for four attempts.
+        assert len(responses.calls) < 10
+
+    @responses.activate
+    def test_deadline_expires_during_attempt(self) -> None:
+        api = APIClient(addr='https://api.taskpr.io', retries=10)
+
+        def callback(request: object) -> Tuple[int, Dict[str, str], str]:
+            time.sleep(0.3)
+            return (HTTPStatus.SERVICE_UNAVAILABLE.value, {}, '')
+
+        responses.add_callback(responses.GET, f'{api.addr}/plan', callback=callback)
+        with pytest.raises(DeadlineExceeded) as exc:
+            api.get_plan(deadline=Deadline(0.5))
+        assert exc.value.__cause__ is not None
+        assert len(responses.calls) == 2
+
+    @responses.activate
+    def test_expired_deadline(self) -> None:
+        api = APIClient(addr='https://api.taskpr.io')
+        with pytest.raises(DeadlineExceeded):
+            api.get_task(task_id=generate_task_id(), deadline=Deadline(0))
+        assert len(responses.calls) == 0
+
+    def test_deadline_bounds_attempt(self, slow_server: str) -> None:
+        api = APIClient(addr=slow_server)
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            api.get_task(task_id=generate_task_id(), deadline=Deadline(0.3))
+        assert time.monotonic() - start < 1
+
+    def test_per_method_deadline(self, slow_server: str) -> None:
+        api = APIClient(addr=slow_server, deadlines={'get_task': 0.3})
+        start = time.monotonic()
+        with pytest.raises(DeadlineExceeded):
+            api.get_task(task_id=generate_task_id())
+        assert time.monotonic() - start < 1
+        assert api.deadline('update_plan') is None
@@ -0,0 +1,220 @@
+import json
+import time
+import urllib.parse
+from http import HTTPStatus
+from typing import Any, Dict, List, Tuple
+
+import pytest
+import requests
+import responses
+
+from priolib.client import APIClient, APIError
+from priolib.feed import ChangeFeed
+from priolib.model import Event
+
+from local_server import TaskHandler, serving
+
+ADDR = 'https://api.taskpr.io'
+
+
+def task_json(id_: str, status: str) -> Dict[str, Any]:
+    return {
+        'createdDate': '2007-01-25T12:00:00Z',
+        'id': id_,
+        'modifiedDate': '2007-01-25T12:00:00Z',
+        'targetLink': 'https://example.com',
+        'title': f'Task {id_}',
+        'status': status,
+    }
+
+
+def plan_json(**lanes: List[str]) -> Dict[str, Any]:
+    contents = []
+    for status in ('Done', 'Today', 'Todo', 'Blocked', 'Later'):
+        ids = lanes.get(status.lower(), [])
+        contents.append({
+            'status': status,
+            'contents': [task_json(id_, status) for id_ in ids],
+        })
+    return {'contents': contents}
+
+
+class FakeFeed:
+
+    def __init__(self, head: int, events: List[Dict[str, Any]]) -> None:
+        self.head = head
+        self.events = events
+        self.offsets: List[str] = []
+
+    def __call__(self, request: Any) -> Tuple[int, Dict[str, str], str]:
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(request.url).query)
+        if 'offset' not in query:
+            return (HTTPStatus.OK.value, {}, json.dumps({'offset': self.head}))
+        offset = int(query['offset'][0])
+        self.offsets.append(query['offset'][0])
+        pending = [e for e in self.events if e['offset'] > offset]
+        next_offset = pending[-1]['offset'] if pending else offset
+        body = {'offset': next_offset, 'contents': pending}
+        return (HTTPStatus.OK.value, {}, json.dumps(body))
+
+
+class _LongPollHandler(TaskHandler):
+    """
+    Hold every request for ``latency`` seconds, then report offset 3.
+    """
+
+    latency = 0.6
+
+    def do_GET(self) -> None:
+        time.sleep(self.latency)
+        self.send_json({'offset': 3, 'contents': []})
+
+
+class TestChangeFeed:
+
+    @pytest.fixture()
+    def api(self) -> APIClient:
+        return APIClient(addr=ADDR, retries=1)
+
+    @responses.activate
+    def test_apply_events(self, api: APIClient) -> None:
+        responses.add(
+            responses.GET, f'{ADDR}/plan',
+            json=plan_json(today=['a', 'b'], later=['c']),
+        )
+        fake = FakeFeed(head=5, events=[
+            {'offset': 6, 'kind': 'TaskCreated', 'task': task_json('d', 'Today'), 'index': 0},
+            {'offset': 7, 'kind': 'TaskUpdated', 'task': task_json('b', 'Done')},
+            {'offset': 8, 'kind': 'TaskDeleted', 'taskId': 'c'},
+        ])
+        responses.add_callback(responses.GET, f'{ADDR}/events', callback=fake)
+        feed = ChangeFeed(api, wait=0)
+        seen: List[Event] = []
+        feed.subscribe(seen.append)
+
+        events = feed.poll()
+
+        assert [e.kind for e in seen] == [
+            'PlanUpdated', 'TaskCreated', 'TaskUpdated', 'TaskDeleted']
+        assert len(events) == 3
+        assert feed.offset == 8
+        assert feed.available
+        assert [t.id for t in feed.plan.today] == ['d', 'a']
+        assert [t.id for t in feed.plan.done] == ['b']
+        assert feed.plan.later == []
+        assert sorted(feed.tasks) == ['a', 'b', 'd']
+        assert fake.offsets == ['5']
+
+    @responses.activate
+    def test_update_keeps_position(self, api: APIClient) -> None:
+        responses.add(
+            responses.GET, f'{ADDR}/plan',
+            json=plan_json(today=['a', 'b', 'c']),
+        )
+        fake = FakeFeed(head=0, events=[
+            {'offset': 1, 'kind': 'TaskUpdated', 'task': task_json('b', 'Today')},
+        ])
+        responses.add_callback(responses.GET, f'{ADDR}/events', callback=fake)
+        feed = ChangeFeed(api, wait=0)
+        feed.poll()
+        assert [t.id for t in feed.plan.today] == ['a', 'b', 'c']
+
+    @responses.activate
+    def test_resume_from_offset(self, api: APIClient) -> None:
+        responses.add(responses.GET, f'{ADDR}/plan', json=plan_json())
+        fake = FakeFeed(head=3, events=[
+            {'offset': 4, 'kind': 'TaskCreated', 'task': task_json('a', 'Todo')},
+        ])
+        responses.add_callback(responses.GET, f'{ADDR}/events', callback=fake)
+        feed = ChangeFeed(api, wait=0)
+        feed.poll()
+        assert feed.offset == 4
+
+        responses.replace(
+            responses.GET, f'{ADDR}/events',
+            body=requests.exceptions.ConnectionError('connection reset'),
+        )
+        assert feed.poll() == []
+        assert not feed.available
+        assert feed.offset == 4
+
+        fake.events.append(
+            {'offset': 5, 'kind': 'TaskCreated', 'task': task_json('b', 'Todo')})
+        responses.remove(responses.GET, f'{ADDR}/events')
+        responses.add_callback(responses.GET, f'{ADDR}/events', callback=fake)
+        feed.poll()
+        assert fake.offsets == ['3', '4']
+        assert [t.id for t in feed.plan.todo] == ['a', 'b']
+        assert feed.available
+
+    @responses.activate
+    def test_fallback_to_full_refresh(self, api: APIClient) -> None:
+        responses.add(
+            responses.GET, f'{ADDR}/plan',
+            json=plan_json(blocked=['a']),
+        )
+        responses.add(
+            responses.GET, f'{ADDR}/events',
+            status=HTTPStatus.NOT_FOUND.value,
+        )
+        feed = ChangeFeed(api, wait=0, fallback_interval=60)
+        assert feed.poll() == []
+        assert not feed.available
+        assert [t.id for t in feed.plan.blocked] == ['a']
+        plan_calls = [c for c in responses.calls if c.request.url.endswith('/plan')]
+        assert len(plan_calls) == 1
+
+        # Within the fallback interval no further full refresh is made.
+        feed.poll()
+        plan_calls = [c for c in responses.calls if c.request.url.endswith('/plan')]
+        assert len(plan_calls) == 1
+
+    @responses.activate
+    def test_failed_snapshot_is_retried(self, api: APIClient) -> None:
+        for _ in range(2):
+            responses.add(
+                responses.GET, f'{ADDR}/plan',
+                status=HTTPStatus.SERVICE_UNAVAILABLE.value,
+            )
+        responses.add(responses.GET, f'{ADDR}/plan', json=plan_json(today=['a']))
+        fake = FakeFeed(head=5, events=[])
+        responses.add_callback(responses.GET, f'{ADDR}/events', callback=fake)
+        feed = ChangeFeed(api, wait=0)
+        with pytest.raises(APIError):
+            feed.poll()
+        assert feed.offset is None
+
+        feed.poll()
+        assert feed.offset == 5
+        assert feed.available
+        assert [t.id for t in feed.plan.today] == ['a']
+
+    @responses.activate
+    def test_gone_starts_over(self, api: APIClient) -> None:
+        responses.add(responses.GET, f'{ADDR}/plan', json=plan_json())
+        fake = FakeFeed(head=3, events=[])
+        responses.add_callback(responses.GET, f'{ADDR}/events', callback=fake)
+        feed = ChangeFeed(api, wait=0, fallback_interval=0)
+        feed.poll()
+        assert feed.offset == 3
+
+        responses.remove(responses.GET, f'{ADDR}/events')
+        responses.add(
+            responses.GET, f'{ADDR}/events',
+            json={
+                'reason': 'Offset Expired',
+                'message': 'Offset 3 is no longer retained.',
+                'details': 'Resynchronize from the current head.',
+            },
+            status=HTTPStatus.GONE.value,
+        )
+        assert feed.poll() == []
+        assert feed.offset is None
+        assert not feed.available
+
+    def test_long_poll_outlasts_read_timeout(self) -> None:
+        with serving(_LongPollHandler) as addr:
+            api = APIClient(addr=addr, retries=1)
+            api.http.timeout = (3.05, 0.3)
+            assert api.get_events(3, wait=0.5) == (3, [])
+            api.close()
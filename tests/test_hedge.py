@@ -0,0 +1,185 @@
+import itertools
+import threading
+import time
+from http import HTTPStatus
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+import pytest
+import responses
+
+from priolib.client import APIClient
+from priolib.hedge import Hedging
+
+from local_server import TaskHandler, serving
+
+
+class _KeepAliveHandler(TaskHandler):
+    """
+    HTTP/1.1 task server recording the client port of every request.
+    """
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; avoid delayed-ACK stalls.
+    disable_nagle_algorithm = True
+    latency = 0
+    ports: Set[int] = set()
+
+    def do_GET(self) -> None:
+        self.ports.add(self.client_address[1])
+        super().do_GET()
+
+
+def slow_first(delays: List[float]) -> Callable[[], int]:
+    """
+    Return a function whose n-th call sleeps ``delays[n]`` and returns n.
+    """
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def fn() -> int:
+        with lock:
+            n = next(counter)
+        time.sleep(delays[n])
+        return n
+    return fn
+
+
+class TestHedging:
+
+    def test_hedge_wins(self) -> None:
+        hedging = Hedging(delay=0.05, max_rate=1)
+        discarded: List[int] = []
+        assert hedging.run(slow_first([0.5, 0]), discard=discarded.append) == 1
+        assert hedging.stats.requests == 1
+        assert hedging.stats.hedged == 1
+        assert hedging.stats.hedge_wins == 1
+        assert hedging.stats.win_rate == 1
+        time.sleep(0.6)
+        assert discarded == [0]
+        hedging.shutdown()
+
+    def test_fast_request_not_hedged(self) -> None:
+        hedging = Hedging(delay=0.2, max_rate=1)
+        assert hedging.run(slow_first([0])) == 0
+        assert hedging.stats.hedged == 0
+        hedging.shutdown()
+
+    def test_rate_cap(self) -> None:
+        hedging = Hedging(delay=0.01, max_rate=0.25)
+        for _ in range(3):
+            hedging.run(slow_first([0]))
+        hedging.run(slow_first([0.1, 0]))
+        hedging.run(slow_first([0.1, 0]))
+        assert hedging.stats.hedged == 1
+        assert hedging.stats.capped == 1
+        hedging.shutdown()
+
+    def test_primary_error_falls_back_to_hedge(self) -> None:
+        calls = itertools.count()
+
+        def fn() -> str:
+            if next(calls) == 0:
+                time.sleep(0.1)
+                raise RuntimeError
+            return 'ok'
+        hedging = Hedging(delay=0.01, max_rate=1)
+        assert hedging.run(fn) == 'ok'
+        hedging.shutdown()
+
+    def test_all_fail(self) -> None:
+        def fn() -> None:
+            raise RuntimeError
+        hedging = Hedging(delay=0.01, max_rate=1)
+        with pytest.raises(RuntimeError):
+            hedging.run(fn)
+        hedging.shutdown()
+
+    def test_primaries_not_limited_by_pool(self) -> None:
+        hedging = Hedging(delay=5, max_rate=1, max_workers=2)
+        start = time.monotonic()
+        threads = [
+            threading.Thread(target=hedging.run, args=(lambda: time.sleep(0.2),))
+            for _ in range(32)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert time.monotonic() - start < 1
+        assert hedging.stats.requests == 32
+        assert hedging.stats.hedged == 0
+        hedging.shutdown()
+
+    def test_percentile_delay(self) -> None:
+        hedging = Hedging(min_samples=10, percentile=0.9)
+        assert hedging.hedge_delay() is None
+        for _ in range(10):
+            hedging.run(slow_first([0]))
+        assert hedging.hedge_delay() is not None
+        hedging.shutdown()
+
+
+class TestHedgedClient:
+
+    @responses.activate
+    def test_get_is_hedged(self) -> None:
+        api = APIClient(
+            addr='https://api.taskpr.io',
+            hedging=Hedging(delay=0.05, max_rate=1),
+        )
+        calls = itertools.count()
+
+        def callback(request: Any) -> Tuple[int, Dict[str, str], str]:
+            if next(calls) == 0:
+                time.sleep(0.5)
+            return (HTTPStatus.OK.value, {}, '{"kind": "Collection", "contents": []}')
+
+        responses.add_callback(responses.GET, f'{api.addr}/tasks', callback=callback)
+        start = time.monotonic()
+        assert api.list_tasks() == []
+        assert time.monotonic() - start < 0.4
+        assert api.hedging.stats.hedge_wins == 1
+        time.sleep(0.5)
+        api.close()
+
+    @responses.activate
+    def test_writes_are_not_hedged(self) -> None:
+        api = APIClient(
+            addr='https://api.taskpr.io',
+            hedging=Hedging(delay=0, max_rate=1),
+        )
+        responses.add(
+            method=responses.DELETE,
+            url=f'{api.addr}/tasks/foo',
+            status=HTTPStatus.NO_CONTENT.value,
+        )
+        api.delete_task('foo')
+        assert len(responses.calls) == 1
+        assert api.hedging.stats.requests == 0
+
+    @responses.activate
+    def test_long_poll_is_not_hedged(self) -> None:
+        api = APIClient(
+            addr='https://api.taskpr.io',
+            hedging=Hedging(delay=0, max_rate=1),
+        )
+        responses.add(
+            method=responses.GET,
+            url=f'{api.addr}/events',
+            json={'offset': 3},
+        )
+        assert api.get_events() == (3, [])
+        assert len(responses.calls) == 1
+        assert api.hedging.stats.requests == 0
+
+    @pytest.mark.parametrize('hedging', [None, Hedging(delay=1.0, max_rate=1)])
+    def test_connections_reused(self, hedging: Any) -> None:
+        _KeepAliveHandler.ports = set()
+        with serving(_KeepAliveHandler) as addr:
+            api = APIClient(addr=addr, hedging=hedging)
+            for n in range(20):
+                assert api.get_task(f'task-{n}').id == f'task-{n}'
+            api.close()
+        assert len(_KeepAliveHandler.ports) == 1
+        if hedging is not None:
+            assert hedging.stats.requests == 20
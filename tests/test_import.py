@@ -0,0 +1,47 @@
+import subprocess
+import sys
+from typing import List, Tuple
+
+import pytest
+
+
+# Generous enough for slow CI machines, yet an order of magnitude below the
+# cost of importing ``requests`` and its dependency tree.
+IMPORT_BUDGET = 0.05
+
+HEAVY_MODULES = ('requests', 'retrying', 'iso8601', 'urllib3')
+
+PROBE = '''
+import sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(elapsed)
+print(','.join(m for m in {heavy!r} if m in sys.modules))
+'''
+
+
+def import_module(module: str) -> Tuple[float, List[str]]:
+    """
+    Import a module in a fresh interpreter and report the import time and
+    the heavyweight dependencies it loaded.
+    """
+    out = subprocess.run(
+        [sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+        check=True,
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+    ).stdout.splitlines()
+    return float(out[0]), [m for m in out[1].split(',') if m]
+
+
+@pytest.mark.parametrize('module', ['priolib', 'priolib.model', 'priolib.client'])
+def test_import_is_lazy(module: str) -> None:
+    _, loaded = import_module(module)
+    assert loaded == []
+
+
+@pytest.mark.parametrize('module', ['priolib.model', 'priolib.client'])
+def test_import_budget(module: str) -> None:
+    elapsed = min(import_module(module)[0] for _ in range(3))
+    assert elapsed < IMPORT_BUDGET
@@ -0,0 +1,108 @@
+import datetime
+
+import pytest
+
+from priolib.index import TaskIndex
+from priolib.model import Task
+
+
+def make_task(id_: str, status: str, priority: str, day: int) -> Task:
+    return Task(
+        id_=id_,
+        title=f'Task {id_}',
+        status=status,
+        priority=priority,
+        created=f'2007-01-{day:02d}T12:00:00Z',
+        modified=f'2007-01-{day:02d}T12:00:00Z',
+    )
+
+
+def date(day: int) -> datetime.datetime:
+    return datetime.datetime(2007, 1, day, tzinfo=datetime.timezone.utc)
+
+
+class TestTaskIndex:
+
+    @pytest.fixture()
+    def index(self) -> TaskIndex:
+        return TaskIndex([
+            make_task('a', 'Blocked', '3', 1),
+            make_task('b', 'Today', '1', 5),
+            make_task('c', 'Blocked', '2', 10),
+            make_task('d', 'Today', '10', 12),
+            make_task('e', 'Later', '', 20),
+        ])
+
+    def test_status(self, index: TaskIndex) -> None:
+        assert [t.id for t in index.query().status('Blocked')] == ['a', 'c']
+        assert [t.id for t in index.query().status('Blocked', 'Later')] == ['a', 'c', 'e']
+        assert index.query().status('Done').all() == []
+
+    def test_created_range(self, index: TaskIndex) -> None:
+        q = index.query().created(since=date(5), until=date(12))
+        assert [t.id for t in q] == ['b', 'c']
+        recent_blocked = index.query().status('Blocked').created(since=date(6))
+        assert [t.id for t in recent_blocked] == ['c']
+
+    def test_naive_bounds_are_local_time(self, index: TaskIndex) -> None:
+        assert index.query().created(since=datetime.datetime.now() - datetime.timedelta(7)).all() == []
+        since = date(10).astimezone().replace(tzinfo=None)
+        q = index.query().modified(since=since, until=since + datetime.timedelta(days=3))
+        assert [t.id for t in q] == ['c', 'd']
+
+    def test_order_by_priority(self, index: TaskIndex) -> None:
+        q = index.query().status('Today').order_by('priority')
+        assert [t.id for t in q] == ['b', 'd']
+        ordered = index.query().order_by('priority')
+        assert [t.id for t in ordered] == ['b', 'c', 'a', 'd', 'e']
+        assert ordered.first().id == 'b'
+        assert [t.id for t in ordered.limit(2)] == ['b', 'c']
+
+    def test_order_by_priority_descending(self, index: TaskIndex) -> None:
+        ordered = index.query().order_by('priority', descending=True)
+        assert [t.id for t in ordered] == ['d', 'a', 'c', 'b', 'e']
+        index.add(make_task('f', 'Today', '', 21))
+        today = index.query().status('Today', 'Later').order_by('priority', descending=True)
+        assert [t.id for t in today] == ['d', 'b', 'e', 'f']
+        for i in range(20):
+            index.add(make_task(f'x{i}', 'Done', str(i), 22))
+        # Few candidates are sorted directly instead of scanning the index.
+        today = index.query().status('Today').order_by('priority', descending=True)
+        assert [t.id for t in today] == ['d', 'b', 'f']
+
+    def test_order_by_created_descending(self, index: TaskIndex) -> None:
+        q = index.query().order_by('created', descending=True).limit(3)
+        assert [t.id for t in q] == ['e', 'd', 'c']
+        assert q.count() == 3
+
+    def test_where(self, index: TaskIndex) -> None:
+        q = index.query().where(lambda t: t.id in ('a', 'd')).order_by('priority')
+        assert [t.id for t in q] == ['a', 'd']
+
+    def test_invalid_order(self, index: TaskIndex) -> None:
+        with pytest.raises(ValueError):
+            index.query().order_by('title')
+
+    def test_update(self, index: TaskIndex) -> None:
+        task = index.get('a')
+        task.status = 'Today'
+        task.priority = '0'
+        index.update(task)
+        assert [t.id for t in index.query().status('Blocked')] == ['c']
+        today = index.query().status('Today').order_by('priority')
+        assert [t.id for t in today] == ['a', 'b', 'd']
+
+    def test_add_replaces(self, index: TaskIndex) -> None:
+        index.add(make_task('b', 'Done', '1', 25))
+        assert len(index) == 5
+        assert index.query().status('Today').count() == 1
+        assert [t.id for t in index.query().created(since=date(21))] == ['b']
+
+    def test_remove(self, index: TaskIndex) -> None:
+        removed = index.remove('c')
+        assert removed.id == 'c'
+        assert 'c' not in index
+        assert [t.id for t in index.query().status('Blocked')] == ['a']
+        assert [t.id for t in index.query().order_by('priority')] == ['b', 'a', 'd', 'e']
+        with pytest.raises(KeyError):
+            index.remove('c')
@@ -1,5 +1,9 @@
 import json
 import datetime
+import random
+from typing import List
+
+import pytest
 
 import priolib.model
 
@@ -43,6 +47,23 @@ class TestTask:
         assert task.modified == datetime.datetime(
             2007, 1, 25, 12, 0, tzinfo=datetime.timezone.utc)
 
+    def test_priority(self) -> None:
+        t = priolib.model.Task(id_='foo', priority='2')
+        assert t.priority == '2'
+        assert json.dumps(t, cls=priolib.model.Encoder, sort_keys=True) == (
+            '{"id": "foo", "priority": "2"}'
+        )
+        json_repr = {
+            'id': 'foo',
+            'title': 'bar',
+            'targetLink': 'baz',
+            'status': 'foo',
+            'priority': '2',
+            'createdDate': '2007-01-25T12:00:00Z',
+            'modifiedDate': '2007-01-25T12:00:00Z',
+        }
+        assert priolib.model.Task.unmarshal_json(json_repr).priority == '2'
+
 
 class TestPlan:
 
@@ -111,3 +132,195 @@ class TestPlan:
             '"title": "bar"}], "later": [], "today": [], "todo": []}'
         )
         assert json_repr == expected
+
+
+def make_tasks(n: int) -> List[priolib.model.Task]:
+    return [priolib.model.Task(id_=f't{i}', title=f'Task {i}') for i in range(n)]
+
+
+class TestRanks:
+
+    def test_rank_between(self) -> None:
+        assert priolib.model.rank_between('', None) == 'i'
+        assert '' < priolib.model.rank_between('', 'a') < 'a'
+        assert 'a' < priolib.model.rank_between('a', 'b') < 'b'
+        assert 'a' < priolib.model.rank_between('a', 'a1') < 'a1'
+        assert 'z' < priolib.model.rank_between('z', None)
+        with pytest.raises(ValueError):
+            priolib.model.rank_between('b', 'a')
+
+    def test_repeated_insert_between(self) -> None:
+        lo, hi = 'a', 'b'
+        for _ in range(200):
+            mid = priolib.model.rank_between(lo, hi)
+            assert lo < mid < hi
+            assert not mid.endswith('0')
+            hi = mid
+        assert len(hi) < 50
+
+    def test_long_keys(self) -> None:
+        lo = 'a' + 'z' * 5000
+        assert lo < priolib.model.rank_between(lo, 'b') < 'b'
+        assert lo < priolib.model.rank_between(lo, None)
+
+    def test_rank_after_before(self) -> None:
+        assert priolib.model.rank_after('i') == 'i001'
+        assert priolib.model.rank_before('i') == 'hzzz'
+        # Without room for a full step the gap is halved instead.
+        assert priolib.model.rank_after('zzzz') == 'zzzzi'
+        assert priolib.model.rank_before('0001') == '0000i'
+
+    def test_spread_ranks(self) -> None:
+        for n in (0, 1, 2, 17, 35, 36, 1000):
+            ranks = priolib.model.spread_ranks(n)
+            assert len(ranks) == n
+            assert ranks == sorted(set(ranks))
+            assert all(r and not r.endswith('0') for r in ranks)
+
+
+class TestLane:
+
+    def test_list_behaviour(self) -> None:
+        tasks = make_tasks(5)
+        lane = priolib.model.Lane(tasks)
+        assert len(lane) == 5
+        assert list(lane) == tasks
+        assert lane == tasks
+        assert lane[0] is tasks[0]
+        assert lane[-1] is tasks[-1]
+        assert lane[1:3] == tasks[1:3]
+        assert 't2' in lane and tasks[2] in lane
+        del lane[0]
+        assert lane == tasks[1:]
+
+    def test_move_changes_one_rank(self) -> None:
+        tasks = make_tasks(10)
+        lane = priolib.model.Lane(tasks)
+        before = lane.ranks()
+        rank = lane.move('t8', 1)
+        after = lane.ranks()
+        assert [k for k in before if before[k] != after[k]] == ['t8']
+        assert after['t8'] == rank
+        assert [t.id for t in lane] == ['t0', 't8', 't1', 't2', 't3', 't4', 't5', 't6', 't7', 't9']
+        assert lane.index('t8') == 1
+
+    def test_insert_remove(self) -> None:
+        lane = priolib.model.Lane()
+        a, b, c = make_tasks(3)
+        lane.append(a)
+        lane.insert(0, b)
+        lane.insert(1, c)
+        assert [t.id for t in lane] == ['t1', 't2', 't0']
+        with pytest.raises(ValueError):
+            lane.append(a)
+        assert lane.remove('t2') == 1
+        assert [t.id for t in lane] == ['t1', 't0']
+        with pytest.raises(KeyError):
+            lane.remove('t2')
+
+    def test_task_or_id(self) -> None:
+        tasks = make_tasks(3)
+        lane = priolib.model.Lane(tasks)
+        assert lane.index(tasks[1]) == lane.index('t1') == 1
+        assert lane.rank(tasks[1]) == lane.rank('t1')
+        lane.move(tasks[2], 0)
+        assert lane.remove(tasks[0]) == 1
+        assert [t.id for t in lane] == ['t2', 't1']
+        with pytest.raises(KeyError):
+            lane.index(tasks[0])
+
+    def test_list_mutators(self) -> None:
+        a, b, c, d = make_tasks(4)
+        lane = priolib.model.Lane([a, b])
+        lane.extend([c])
+        lane += [d]
+        assert lane == [a, b, c, d]
+        assert lane.pop() is d
+        assert lane.pop(0) is a
+        assert lane == [b, c]
+        rank = lane.rank('t1')
+        lane[0] = a
+        assert lane == [a, c]
+        assert lane.rank('t0') == rank
+        with pytest.raises(ValueError):
+            lane[0] = c
+        lane.extend([b, d])
+        lane.sort(key=lambda t: t.id, reverse=True)
+        assert [t.id for t in lane] == ['t3', 't2', 't1', 't0']
+        lane.reverse()
+        assert [t.id for t in lane] == ['t0', 't1', 't2', 't3']
+        assert lane + [] == [a, b, c, d]
+        assert [] + lane == [a, b, c, d]
+        assert lane[:2] + lane == [a, b, a, b, c, d]
+        lane.clear()
+        assert lane == [] and len(lane) == 0
+        with pytest.raises(IndexError):
+            lane.pop()
+
+    def test_append_keys_stay_short(self) -> None:
+        tasks = make_tasks(10000)
+        lane = priolib.model.Lane()
+        lane.extend(tasks[5000:])
+        for task in reversed(tasks[:5000]):
+            lane.insert(0, task)
+        assert list(lane) == tasks
+        assert max(len(r) for r in lane.ranks().values()) <= priolib.model.RANK_STEP_WIDTH
+
+    def test_renumbered_when_keys_grow(self) -> None:
+        tasks = make_tasks(3000)
+        lane = priolib.model.Lane(tasks[:2])
+        expected = tasks[:2]
+        for task in tasks[2:]:
+            lane.insert(1, task)
+            expected.insert(1, task)
+            lane.move(expected[1], 2)
+            expected.insert(2, expected.pop(1))
+        assert list(lane) == expected
+        assert max(len(r) for r in lane.ranks().values()) <= priolib.model.MAX_RANK_LENGTH
+
+    def test_matches_list(self) -> None:
+        rng = random.Random(7)
+        tasks = make_tasks(50)
+        lane = priolib.model.Lane(tasks[:20])
+        expected = tasks[:20]
+        pending = tasks[20:]
+        for _ in range(500):
+            op = rng.random()
+            if op < 0.3 and pending:
+                task = pending.pop()
+                index = rng.randint(0, len(expected))
+                lane.insert(index, task)
+                expected.insert(index, task)
+            elif op < 0.4 and expected:
+                task = expected.pop(rng.randrange(len(expected)))
+                lane.remove(task.id)
+                pending.append(task)
+            elif expected:
+                task = expected.pop(rng.randrange(len(expected)))
+                index = rng.randint(0, len(expected))
+                lane.move(task.id, index)
+                expected.insert(index, task)
+            assert list(lane) == expected
+
+
+class TestPlanLanes:
+
+    def test_marshal_json(self) -> None:
+        tasks = make_tasks(3)
+        plan = priolib.model.Plan(tasks[:2], [tasks[2]], [], [], [])
+        assert isinstance(plan.done, priolib.model.Lane)
+        plan.done.move('t1', 0)
+        assert json.loads(json.dumps(plan, cls=priolib.model.Encoder)) == {
+            'done': [{'id': 't1', 'title': 'Task 1'}, {'id': 't0', 'title': 'Task 0'}],
+            'today': [{'id': 't2', 'title': 'Task 2'}],
+            'todo': [],
+            'blocked': [],
+            'later': [],
+        }
+
+    def test_lane_by_status(self) -> None:
+        plan = priolib.model.Plan([], [], [], [], [])
+        plan.lane('Blocked').append(make_tasks(1)[0])
+        assert [t.id for t in plan.blocked] == ['t0']
+        with pytest.raises(ValueError):
+            plan.lane('Unknown')
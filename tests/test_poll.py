@@ -0,0 +1,112 @@
+import threading
+import time
+from typing import List
+
+import pytest
+
+from priolib.model import Plan, Task
+from priolib.poll import Diff, Poller
+
+
+def make_task(id_: str, title: str = 'Task', modified: str = '2007-01-25T12:00:00Z') -> Task:
+    return Task(id_=id_, title=title, status='Todo', created=modified, modified=modified)
+
+
+class FakeServer:
+
+    def __init__(self, tasks: List[Task]) -> None:
+        self.tasks = tasks
+        self.calls = 0
+
+    def list_tasks(self) -> List[Task]:
+        self.calls += 1
+        return list(self.tasks)
+
+
+class TestPoller:
+
+    def test_diffs_per_subscriber(self) -> None:
+        server = FakeServer([make_task('a'), make_task('b')])
+        poller = Poller(server.list_tasks)
+        first: List[Diff] = []
+        poller.subscribe(first.append)
+        assert not poller.poll()
+        assert [t.id for t in first[0].added] == ['a', 'b']
+
+        server.tasks = [make_task('a', title='Changed'), make_task('c')]
+        late: List[Diff] = []
+        poller.subscribe(late.append)
+        assert poller.poll()
+        assert server.calls == 2
+
+        assert [t.id for t in first[1].added] == ['c']
+        assert [t.id for t in first[1].changed] == ['a']
+        assert first[1].removed == ['b']
+        assert [t.id for t in late[0].added] == ['a', 'c']
+        assert late[0].changed == [] and late[0].removed == []
+
+        # Nothing changed: no diff is delivered.
+        assert not poller.poll()
+        assert len(first) == 2 and len(late) == 1
+
+    def test_reorder_in_plan(self) -> None:
+        a, b = make_task('a'), make_task('b')
+        plans = [Plan([], [a, b], [], [], []), Plan([], [b, a], [], [], [])]
+        poller = Poller(lambda: plans[0])
+        diffs: List[Diff] = []
+        poller.subscribe(diffs.append)
+        poller.poll()
+        plans.pop(0)
+        assert poller.poll()
+        assert diffs[1].reordered
+        assert diffs[1].value.today == [b, a]
+
+    def test_interval_backs_off_when_idle(self) -> None:
+        server = FakeServer([make_task('a')])
+        poller = Poller(server.list_tasks, min_interval=1, max_interval=5, backoff=2)
+        for _ in range(5):
+            poller.poll()
+        assert poller.interval == 5
+
+    def test_interval_follows_change_rate(self) -> None:
+        server = FakeServer([make_task('a')])
+        poller = Poller(server.list_tasks, min_interval=1, max_interval=600, backoff=2)
+        poller.poll()
+        for minute in range(1, 4):
+            server.tasks = [make_task('a', modified=f'2007-01-25T12:{minute * 10:02d}:00Z')]
+            poller.poll()
+        # Changes every ten minutes: poll every five.
+        assert poller.interval == 300
+
+    def test_jitter_bounds(self) -> None:
+        poller = Poller(lambda: [], min_interval=10, max_interval=10, jitter=0.2)
+        delays = [poller.delay() for _ in range(100)]
+        assert all(8 <= d <= 12 for d in delays)
+
+    def test_invalid_bounds(self) -> None:
+        with pytest.raises(ValueError):
+            Poller(lambda: [], min_interval=10, max_interval=1)
+
+    def test_concurrent_polls_share_request(self) -> None:
+        release = threading.Event()
+        calls = []
+
+        def fetch() -> List[Task]:
+            calls.append(1)
+            release.wait(5)
+            return [make_task('a')]
+
+        poller = Poller(fetch)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(poller.poll()))
+            for _ in range(5)
+        ]
+        for t in threads:
+            t.start()
+        time.sleep(0.1)
+        release.set()
+        for t in threads:
+            t.join()
+        assert len(calls) == 1
+        assert results == [False] * 5
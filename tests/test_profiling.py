@@ -0,0 +1,91 @@
+import os
+import subprocess
+import sys
+import time
+from typing import Any, Iterator
+
+import pytest
+import responses
+
+from priolib import profiling
+from priolib.client import APIClient
+from priolib.model import Task
+
+ADDR = 'https://api.taskpr.io'
+
+
+@pytest.fixture(autouse=True)
+def clean_stats() -> Iterator[None]:
+    profiling.reset()
+    yield
+    profiling.reset()
+
+
+class TestProfiling:
+
+    def test_disabled_by_default(self) -> None:
+        assert not profiling.enabled()
+        with profiling.stage('transport'):
+            pass
+        assert profiling.stats() == {}
+
+    @responses.activate
+    def test_stages(self) -> None:
+        responses.add(
+            responses.GET, f'{ADDR}/tasks',
+            json={'contents': [{
+                'id': 'foo',
+                'title': 'bar',
+                'targetLink': 'baz',
+                'status': 'Todo',
+                'createdDate': '2007-01-25T12:00:00Z',
+                'modifiedDate': '2007-01-25T12:00:00Z',
+            }]},
+        )
+        responses.add(responses.PATCH, f'{ADDR}/tasks/foo', status=204)
+        api = APIClient(addr=ADDR)
+        with profiling.profiling():
+            assert profiling.enabled()
+            tasks = api.list_tasks()
+            api.update_task(Task(id_='foo', title='new'))
+        assert not profiling.enabled()
+        assert len(tasks) == 1
+        stats = profiling.stats()
+        assert stats['transport'][0] == 2
+        assert stats['body'][0] == 2
+        assert stats['decode'][0] == 1
+        assert stats['model'][0] == 1
+        assert stats['encode'][0] == 1
+        assert all(total >= 0 for _, total in stats.values())
+        assert 'transport' in profiling.report()
+
+    def test_sample_file(self, tmpdir: Any) -> None:
+        path = str(tmpdir.join('samples.txt'))
+        with profiling.profiling(sample_file=path, interval=0.001):
+            end = time.monotonic() + 0.1
+            while time.monotonic() < end:
+                pass
+        with open(path) as f:
+            lines = f.read().splitlines()
+        assert lines
+        assert any('test_sample_file' in line for line in lines)
+        assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+
+    def test_environment(self, tmpdir: Any) -> None:
+        path = str(tmpdir.join('samples.txt'))
+        env = dict(os.environ, PRIOLIB_PROFILE='1', PRIOLIB_PROFILE_FILE=path)
+        out = subprocess.run(
+            [sys.executable, '-c', (
+                'import time\n'
+                'from priolib import profiling\n'
+                'with profiling.stage("encode"):\n'
+                '    time.sleep(0.05)\n'
+                'print(profiling.stats()["encode"][0])\n'
+            )],
+            env=env,
+            check=True,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+        ).stdout
+        assert out.strip() == '1'
+        assert os.path.exists(path)